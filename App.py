@@ -1,6 +1,5 @@
 #App.py
 import streamlit as st
-import pandas as pd
 import math
 from modules import db_manager, auth, nav
 
@@ -39,7 +38,7 @@ st.subheader("🔍 ค้นหาร้านอาหาร")
 # Row 1: Search & Actions
 c_search, c_sort = st.columns([3, 1])
 query = c_search.text_input("คำค้นหา", value=nav.get_param('search_query', ''), placeholder="ชื่อร้าน, เมนู, ย่าน...")
-sort_option = c_sort.selectbox("เรียงตาม", ['รีวิวมาก -> น้อย', 'รีวิวน้อย -> มาก', 'Rating สูง -> ต่ำ', 'Rating ต่ำ -> สูง'])
+sort_option = c_sort.selectbox("เรียงตาม", ['ความเกี่ยวข้อง', 'รีวิวมาก -> น้อย', 'รีวิวน้อย -> มาก', 'Rating สูง -> ต่ำ', 'Rating ต่ำ -> สูง'])
 
 # Row 2: Advanced Filters
 with st.expander("ตัวกรองเพิ่มเติม", expanded=bool(query)):
@@ -60,39 +59,38 @@ with st.expander("ตัวกรองเพิ่มเติม", expanded=bo
         nav.navigate_to("App.py", {"search_query": ""})
 
 # --- RESTAURANT RESULTS ---
-results = db_manager.search_restaurants_advanced(query, min_rate, min_rev, sort_option)
+# FIX 2.1: Slicer (Pagination) - only the selected page is fetched from DuckDB
+ITEMS_PER_PAGE = 5
 
-if not results.empty:
-    st.write(f"พบ {len(results)} ร้าน")
-    
-    # FIX 2.1: Slicer (Pagination)
-    ITEMS_PER_PAGE = 5
-    total_items = len(results)
-    total_pages = math.ceil(total_items / ITEMS_PER_PAGE)
+def _current_page(key, total_items, per_page):
+    """Page kept in session_state, clamped to the range of the current result set."""
+    total_pages = max(1, math.ceil(total_items / per_page))
+    if st.session_state.get(key, 1) > total_pages:
+        st.session_state[key] = 1
+    return st.session_state.get(key, 1), total_pages
+
+page = st.session_state.get('res_page', 1)
+display_results, total_items = db_manager.search_restaurants_page(query, min_rate, min_rev, sort_option, page, ITEMS_PER_PAGE)
+page, total_pages = _current_page('res_page', total_items, ITEMS_PER_PAGE)
+if display_results.empty and total_items:
+    display_results, total_items = db_manager.search_restaurants_page(query, min_rate, min_rev, sort_option, page, ITEMS_PER_PAGE)
+
+if total_items:
+    st.write(f"พบ {total_items} ร้าน")
     
     # Only show slicer if we have more than 1 page
     if total_pages > 1:
-        page = st.select_slider(
+        st.select_slider(
             "เลือกหน้าแสดงผล", 
             options=range(1, total_pages + 1),
-            value=1,
+            key="res_page",
             format_func=lambda x: f"หน้า {x}/{total_pages}"
         )
-    else:
-        page = 1
-        
-    start_idx = (page - 1) * ITEMS_PER_PAGE
-    end_idx = start_idx + ITEMS_PER_PAGE
-    
-    # Slice the dataframe
-    display_results = results.iloc[start_idx:end_idx]
     
     # Display Grid
     cols = st.columns(3)
-    for idx, row in display_results.iterrows():
-        # idx needs to be reset relative to loop for column placement
-        col_idx = (idx - start_idx) % 3 
-        with cols[col_idx]:
+    for idx, row in display_results.reset_index(drop=True).iterrows():
+        with cols[idx % 3]:
             with st.container(border=True):
                 st.subheader(row['name'])
                 st.caption(f"⭐ {row['average_rating']} | 📝 {row['review_count']} รีวิว")
@@ -103,6 +101,22 @@ if not results.empty:
 else:
     st.info("ไม่พบร้านที่ค้นหา")
 
+# Reviews whose text matches the query (ranked by modules/search.py)
+REVIEW_HITS = 5
+if query:
+    review_hits = db_manager.search_reviews(query, limit=REVIEW_HITS)
+    if not review_hits.empty:
+        with st.expander(f"💬 รีวิวที่พูดถึง \"{query}\" ({len(review_hits)})"):
+            for _, rv in review_hits.iterrows():
+                with st.container(border=True):
+                    h1, h2 = st.columns([4, 1])
+                    h1.markdown(f"**{rv['restaurant_name'] or '-'}** · {rv['reviewer_name']}")
+                    content = str(rv['content'])
+                    h1.write(content if len(content) <= 200 else content[:200] + "...")
+                    h2.write("⭐" * int(rv['rating']))
+                    if rv['restaurant_name'] and h2.button("ดูร้าน", key=f"rv_hit_{rv['id']}"):
+                        nav.navigate_to("pages/2_Restaurant.py", {"id": int(rv['restaurant_id'])})
+
 st.divider()
 
 # --- REVIEWER SEARCH (BOTTOM) ---
@@ -123,28 +137,24 @@ with st.container(border=True):
     if rc6.button("ล้างตัวกรองนักชิม", use_container_width=True):
         st.rerun() # Simple rerun to reset inputs if not bound to session state heavily
 
-reviewers = db_manager.search_reviewers_advanced(r_query, r_min_reviews, r_min_follows, r_revisit, r_sort)
+# FIX 2.2: Slicer for Reviewers
+REV_PER_PAGE = 4
+rev_page = st.session_state.get('rev_page', 1)
+disp_reviewers, total_revs = db_manager.search_reviewers_page(r_query, r_min_reviews, r_min_follows, r_revisit, r_sort, rev_page, REV_PER_PAGE)
+rev_page, total_rev_pages = _current_page('rev_page', total_revs, REV_PER_PAGE)
+if disp_reviewers.empty and total_revs:
+    disp_reviewers, total_revs = db_manager.search_reviewers_page(r_query, r_min_reviews, r_min_follows, r_revisit, r_sort, rev_page, REV_PER_PAGE)
 
-if not reviewers.empty:
-    st.write(f"พบ {len(reviewers)} นักชิม")
-    
-    # FIX 2.2: Slicer for Reviewers
-    REV_PER_PAGE = 4
-    total_revs = len(reviewers)
-    total_rev_pages = math.ceil(total_revs / REV_PER_PAGE)
+if total_revs:
+    st.write(f"พบ {total_revs} นักชิม")
     
     if total_rev_pages > 1:
-        rev_page = st.select_slider(
+        st.select_slider(
             "เลือกหน้าแสดงผลนักชิม", 
             options=range(1, total_rev_pages + 1),
+            key="rev_page",
             format_func=lambda x: f"หน้า {x}/{total_rev_pages}"
         )
-    else:
-        rev_page = 1
-        
-    r_start = (rev_page - 1) * REV_PER_PAGE
-    r_end = r_start + REV_PER_PAGE
-    disp_reviewers = reviewers.iloc[r_start:r_end]
 
     r_cols = st.columns(4)
     # Iterate with index reset logic
@@ -0,0 +1,147 @@
+# modules/aspects.py
+"""
+Keyword and aspect extraction over all reviews at once (no LLM).
+
+extract(reviews) makes one pass over the review text and returns one row
+per restaurant with:
+  keywords            top TF-IDF words / two-word phrases against the corpus
+  <aspect>_mentions   reviews talking about food / service / ambience / price
+  <aspect>_score      average rating of those reviews
+seed_data.py uses it for the keywords column. The whole table is stored
+as snapshot artifact ARTIFACT_NAME under fingerprint() of the reviews,
+whenever the snapshot is written (seed_data --target snapshot) or synced
+(db_manager), and db_manager serves it as the instant (non-AI) summary of
+the restaurant page. No app imports here, so seed_data can use it alone.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+
+# --- CONFIG ---
+TOP_KEYWORDS = 10
+MIN_TERM_COUNT = 2      # a keyword must appear in at least this many of the restaurant's reviews
+MIN_MENTIONS = 2        # aspects mentioned less often are not shown
+# Words common in reviews but not descriptive
+CUSTOM_STOPS = {'good', 'great', 'place', 'food', 'service', 'restaurant', 'visit', 'really', 'also',
+                'nice', 'one', 'get', 'ordered', 'went', 'time', 'like', 'just', 'try', 'tried', 'order'}
+STOP_WORDS = sorted(ENGLISH_STOP_WORDS | CUSTOM_STOPS)
+TOKEN_PATTERN = r"(?u)\b[^\W\d_]{3,}\b"
+ASPECTS = {
+    'food': ['food', 'taste', 'tasty', 'delicious', 'dish', 'dishes', 'flavour', 'flavor', 'flavours',
+             'flavors', 'spicy', 'fresh', 'starters', 'starter', 'dessert', 'desserts', 'menu', 'portion',
+             'portions', 'biryani', 'chicken', 'buffet', 'cooked', 'yummy', 'bland', 'quality'],
+    'service': ['service', 'staff', 'waiter', 'waiters', 'served', 'serve', 'friendly', 'courteous',
+                'attentive', 'polite', 'rude', 'slow', 'prompt', 'hospitality', 'manager', 'helpful',
+                'waiting', 'delivery'],
+    'ambience': ['ambience', 'ambiance', 'atmosphere', 'decor', 'interior', 'interiors', 'music', 'seating',
+                 'vibe', 'vibes', 'lighting', 'cozy', 'cosy', 'crowded', 'noisy', 'view', 'rooftop',
+                 'clean', 'spacious', 'outdoor'],
+    'price': ['price', 'prices', 'priced', 'pricing', 'cost', 'costly', 'expensive', 'cheap', 'affordable',
+              'value', 'money', 'worth', 'budget', 'overpriced', 'pocket', 'bill', 'reasonable'],
+}
+
+ARTIFACT_NAME = 'restaurant_aspects'
+
+def fingerprint(con):
+    """Key of the table for the `reviews` table of a DuckDB connection: any review's restaurant, rating or text."""
+    n, h = con.execute("SELECT COUNT(*), bit_xor(hash(id, restaurant_id, rating, content)) FROM reviews").fetchone()
+    return f"{n}-{h or 0}"
+
+def _restaurant_matrix(review_restaurants):
+    """Restaurant id of each row, and the sparse restaurants x reviews indicator."""
+    ids, rows = np.unique(review_restaurants, return_inverse=True)
+    group = sp.csr_matrix((np.ones(len(rows)), (rows, np.arange(len(rows)))), shape=(len(ids), len(rows)))
+    return ids, group
+
+def _top_keywords(weights, terms, n=TOP_KEYWORDS):
+    """Best terms of one row; a word is skipped when a chosen phrase already has it (and vice versa)."""
+    order = weights.indices[np.argsort(-weights.data, kind='stable')]
+    chosen, words = [], set()
+    for t in order:
+        term = terms[t]
+        parts = term.split()
+        if any(p in words for p in parts):
+            continue
+        chosen.append(term.title())
+        words.update(parts)
+        if len(chosen) == n:
+            break
+    return ", ".join(chosen)
+
+COLUMNS = ['restaurant_id', 'keywords'] + [f"{a}_{c}" for a in ASPECTS for c in ('mentions', 'score')]
+
+def extract_partial(reviews: pd.DataFrame):
+    """
+    First step of extract() for part of the restaurants (every review of a
+    restaurant must be in the same part). Parts can be computed in
+    separate processes and combined with finish().
+    Returns (restaurant ids, restaurant x term counts, terms, aspect columns).
+    """
+    reviews = reviews.dropna(subset=['restaurant_id'])
+    if reviews.empty:
+        return np.array([], dtype=int), sp.csr_matrix((0, 0)), np.array([], dtype=object), pd.DataFrame()
+    text = reviews['content'].fillna("").astype(str).str.lower()
+    rating = pd.to_numeric(reviews['rating'], errors='coerce').to_numpy(dtype=float)
+    ids, group = _restaurant_matrix(reviews['restaurant_id'].astype(int).to_numpy())
+
+    # keyword candidates: review-level counts summed per restaurant
+    counter = CountVectorizer(ngram_range=(1, 2), stop_words=STOP_WORDS, token_pattern=TOKEN_PATTERN,
+                              min_df=MIN_TERM_COUNT, binary=True)
+    try:
+        counts = group @ counter.fit_transform(text)
+        counts = counts.multiply(counts >= MIN_TERM_COUNT).tocsr()
+        counts.eliminate_zeros()
+        terms = counter.get_feature_names_out()
+    except ValueError:  # no term left (empty vocabulary)
+        counts, terms = sp.csr_matrix((len(ids), 0)), np.array([], dtype=object)
+
+    # aspects: which reviews use any word of each aspect, then per-restaurant count / mean rating
+    vocab = sorted({w for words in ASPECTS.values() for w in words})
+    hits = CountVectorizer(vocabulary=vocab, token_pattern=TOKEN_PATTERN, binary=True).transform(text)
+    term_aspect = sp.csr_matrix([[w in ASPECTS[a] for a in ASPECTS] for w in vocab], dtype=float)
+    mentions = ((hits @ term_aspect) > 0).astype(float)           # reviews x aspects
+    rated = ~np.isnan(rating)
+    n = np.asarray((group @ mentions).todense())
+    n_rated = np.asarray((group @ mentions.multiply(rated[:, None])).todense())
+    total = np.asarray((group @ mentions.multiply(np.nan_to_num(rating)[:, None])).todense())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = total / n_rated
+    scores = pd.DataFrame(index=ids)
+    for j, aspect in enumerate(ASPECTS):
+        scores[f"{aspect}_mentions"] = n[:, j].astype(int)
+        scores[f"{aspect}_score"] = np.where(n_rated[:, j] > 0, score[:, j], np.nan)
+    return ids, counts, terms, scores
+
+def finish(parts) -> pd.DataFrame:
+    """
+    extract() result from extract_partial() parts: TF-IDF weights with the
+    document frequencies of all parts, so splitting doesn't change it.
+    """
+    parts = [p for p in parts if len(p[0])]
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS)
+    n_docs = sum(len(ids) for ids, _, _, _ in parts)
+    doc_freq = pd.concat([pd.Series(np.diff(counts.tocsc().indptr), index=terms)
+                          for _, counts, terms, _ in parts if len(terms)] or [pd.Series(dtype=int)])
+    doc_freq = doc_freq.groupby(level=0).sum()
+
+    frames = []
+    for ids, counts, terms, scores in parts:
+        keywords = [""] * len(ids)
+        if len(terms):
+            # same ranking as TfidfTransformer(sublinear_tf=True) (row normalisation doesn't change the order)
+            idf = np.log((1 + n_docs) / (1 + doc_freq.reindex(terms).to_numpy())) + 1
+            weights = counts.astype(float).tocoo()
+            weights.data = (1 + np.log(weights.data)) * idf[weights.col]
+            weights = weights.tocsr()
+            keywords = [_top_keywords(weights[i], terms) for i in range(len(ids))]
+        frames.append(scores.assign(keywords=keywords).rename_axis('restaurant_id').reset_index())
+    return pd.concat(frames, ignore_index=True).sort_values('restaurant_id', ignore_index=True)[COLUMNS]
+
+def extract(reviews: pd.DataFrame) -> pd.DataFrame:
+    """
+    reviews: restaurant_id, rating, content. One row per restaurant_id that
+    has reviews: restaurant_id, keywords, <aspect>_mentions, <aspect>_score.
+    """
+    return finish([extract_partial(reviews)])
@@ -6,261 +6,667 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import numpy as np
 from datetime import datetime
-import io
-# Ensure ollama is installed: pip install ollama
-try:
-    from ollama import chat, ChatResponse
-except ImportError:
-    chat = None
-    ChatResponse = None
+import threading
+import time
+import os
+from modules import snapshot, fake_sheets, sheet_sync, sheet_pool, write_queue, search, result_cache, llm_jobs, fake_llm, summary_store, prompts, llm_gateway, aspects
 
 # --- CONFIG ---
 SERVICE_ACCOUNT_FILE = 'service_account.json'
 SHEET_NAME = 'Restaurant_DB'
+SHEETS = ['restaurants', 'reviews', 'reviewers', 'users']
+SYNC_INTERVAL = 600
+# Point this at a CSV (e.g. data/source_reviews.csv) to run without Google Sheets
+FAKE_SHEETS_CSV = os.environ.get('TASTE_RANK_FAKE_SHEETS')
 
 # --- CONNECTION ---
+_sheet_client = None
+
+def set_sheet_client(client):
+    """Use a gspread-compatible client (e.g. fake_sheets.FakeSheetClient) instead of the service account."""
+    global _sheet_client
+    _sheet_client = client
+    _pool.reset()
+
+def _authorize():
+    if _sheet_client is None and FAKE_SHEETS_CSV:
+        set_sheet_client(fake_sheets.FakeSheetClient(FAKE_SHEETS_CSV))
+    if _sheet_client is not None:
+        return _sheet_client, None
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
+    return gspread.authorize(creds), creds
+
+_pool = sheet_pool.SheetPool(_authorize, SHEET_NAME)
+
 def connect_gsheet():
     try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
-        client = gspread.authorize(creds)
-        return client.open(SHEET_NAME)
+        return _pool.spreadsheet()
     except: 
+        _pool.reset()
+        return None
+
+def get_sheet_api_stats():
+    """Google API calls made by this process, per method."""
+    return _pool.stats()
+
+def get_sheet_revision(sh):
+    """Drive 'modifiedTime' of the spreadsheet; None if it can't be read."""
+    try:
+        return sh.get_lastUpdateTime()
+    except:
         return None
 
 # --- CACHING & LOADING ---
-@st.cache_data(ttl=600, show_spinner=False)
-def load_data():
-    sh = connect_gsheet()
+# Column layout of each sheet, used when a sheet comes back empty so the
+# table still exists and queries return empty frames instead of failing.
+TABLE_SCHEMAS = {
+    'restaurants': "id INTEGER, name VARCHAR, average_rating DOUBLE, review_count INTEGER, keywords VARCHAR, metadata VARCHAR",
+    'reviews': "id INTEGER, restaurant_id INTEGER, reviewer_name VARCHAR, rating INTEGER, content VARCHAR, timestamp TIMESTAMP, pictures INTEGER, reviewer_id INTEGER",
+    'reviewers': "reviewer_id INTEGER, name VARCHAR, total_reviews INTEGER, followers INTEGER",
+    'users': "id INTEGER, username VARCHAR, email VARCHAR, password_hash VARCHAR, followed_reviewers VARCHAR",
+}
+
+def _stringify_objects(df):
+    """Cast mixed-type object columns (e.g. sheet cells holding both numbers and text) to str."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+# Numeric columns per sheet; everything else stays text.
+# Kept as int32 so ids join as DuckDB INTEGER columns.
+INT_COLUMNS = {
+    'restaurants': ['id', 'review_count'],
+    'reviews': ['id', 'restaurant_id', 'rating', 'reviewer_id'],
+    'reviewers': ['reviewer_id', 'total_reviews', 'followers'],
+    'users': ['id'],
+}
+# References to another sheet stay NULL when the cell is empty or not a
+# number, so orphan reviews don't all end up under one fake id 0
+NULLABLE_COLUMNS = {
+    'reviews': ['restaurant_id', 'reviewer_id'],
+}
+
+def _cast_table(name, df):
+    """Type one sheet (or a slice of its columns, as produced by the delta sync)."""
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in INT_COLUMNS.get(name, []):
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            if col in NULLABLE_COLUMNS.get(name, []):
+                df[col] = np.trunc(values).astype('Int32')
+            else:
+                df[col] = values.fillna(0).astype('int32')
+    if name == 'restaurants':
+        if 'average_rating' in df.columns:
+            df['average_rating'] = pd.to_numeric(df['average_rating'], errors='coerce').fillna(0.0)
+        if 'keywords' in df.columns:
+            df['keywords'] = df['keywords'].astype(str)
+    if name == 'reviews' and 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    return _stringify_objects(df)
+
+def _cast_types(data):
+    return {name: _cast_table(name, df) for name, df in data.items()}
+
+def fetch_sheets(sh):
+    """Download every worksheet and return the typed tables."""
     data = {}
-    sheets = ['restaurants', 'reviews', 'reviewers', 'users']
-    
-    if sh:
-        for s in sheets:
-            try:
-                if s == 'users':
-                    records = sh.worksheet(s).get_all_records(numericise_ignore=[5])
-                else:
-                    records = sh.worksheet(s).get_all_records()
-                data[s] = pd.DataFrame(records)
-            except:
-                data[s] = pd.DataFrame()
-    else:
-        for s in sheets:
+    for s in SHEETS:
+        try:
+            if s == 'users':
+                records = sh.worksheet(s).get_all_records(numericise_ignore=[5])
+            else:
+                records = sh.worksheet(s).get_all_records()
+            data[s] = pd.DataFrame(records)
+        except:
             data[s] = pd.DataFrame()
-            
-    # Type Casting
-    if not data['restaurants'].empty:
-        for col in ['id', 'review_count']:
-            data['restaurants'][col] = pd.to_numeric(data['restaurants'][col], errors='coerce').fillna(0).astype(int)
-        data['restaurants']['average_rating'] = pd.to_numeric(data['restaurants']['average_rating'], errors='coerce').fillna(0.0)
-        if 'keywords' in data['restaurants'].columns:
-            data['restaurants']['keywords'] = data['restaurants']['keywords'].astype(str)
-
-    if not data['reviews'].empty:
-        for col in ['restaurant_id', 'rating']:
-            data['reviews'][col] = pd.to_numeric(data['reviews'][col], errors='coerce').fillna(0).astype(int)
-        data['reviews']['timestamp'] = pd.to_datetime(data['reviews']['timestamp'], errors='coerce')
-        if 'reviewer_id' in data['reviews'].columns:
-             data['reviews']['reviewer_id'] = pd.to_numeric(data['reviews']['reviewer_id'], errors='coerce').fillna(0).astype(int)
-
-    if not data['reviewers'].empty:
-        for col in ['reviewer_id', 'total_reviews', 'followers']:
-            data['reviewers'][col] = pd.to_numeric(data['reviewers'][col], errors='coerce').fillna(0).astype(int)
-
-    return data
+    return _cast_types(data)
+
+def _full_sync(sh, revision):
+    for name in SHEETS:
+        _pool.forget_rows(name)
+    data = fetch_sheets(sh)
+    snapshot.save_snapshot(data, revision, extra={'sheets': sheet_sync.sheet_state(data)})
+    _shared.invalidate()
+    _refresh_artifacts()
+
+def _refresh_artifacts():
+    """Compute the tables derived from the reviews now, during the sync, instead of on the next page view."""
+    get_aspect_table()
+
+def sync_snapshot(force=False):
+    """
+    Bring the local tables up to date with Google Sheets when the spreadsheet
+    revision has moved (or always, with force=True). Only appended rows and
+    changed cells of the mutable columns (sheet_sync.SYNC_PLAN) are
+    downloaded; the live tables are patched in place and just the touched
+    tables are rewritten in the snapshot.
+    Returns True if any table changed.
+    """
+    sh = connect_gsheet()
+    if not sh: return False
+    # Queued follow writes go first, otherwise the diff would roll them back;
+    # while they can't be written the sync waits for the next round
+    if not _write_queue.flush():
+        return False
+    revision = get_sheet_revision(sh)
+    manifest = snapshot.read_manifest()
+    if not force and manifest and revision is not None and manifest.get('revision') == revision:
+        return False
+    if not manifest or 'sheets' not in manifest:
+        _full_sync(sh, revision)
+        return True
+
+    local = {name: _shared.read_table(name) for name in SHEETS}
+    deltas = sheet_sync.diff_spreadsheet(sh, local, manifest)
+    for d in deltas:
+        if d.replace is not None or d.append is not None:
+            _pool.forget_rows(d.name)
+    changed = _shared.apply_deltas(deltas)
+    state = {**manifest['sheets'], **sheet_sync.sheet_state(changed)}
+    snapshot.save_snapshot(changed, revision, extra={'sheets': state}, partial=True)
+    if 'reviews' in changed:
+        _refresh_artifacts()
+    return bool(changed)
+
+def load_data():
+    """
+    Typed tables from the local snapshot. Only a cold start without any
+    snapshot waits on Google Sheets; afterwards the background sync keeps
+    the snapshot current.
+    """
+    data, _ = snapshot.load_snapshot()
+    if data is None:
+        sh = connect_gsheet()
+        if sh:
+            data = fetch_sheets(sh)
+            snapshot.save_snapshot(data, get_sheet_revision(sh), extra={'sheets': sheet_sync.sheet_state(data)})
+        else:
+            data = {}
+    return {s: data.get(s, pd.DataFrame()) for s in SHEETS}
+
+def _background_sync(interval):
+    try:
+        # a snapshot loaded without its artifacts (or fetched on a cold start) gets them here
+        _refresh_artifacts()
+    except Exception:
+        pass
+    while True:
+        try:
+            sync_snapshot()
+        except Exception:
+            pass
+        time.sleep(interval)
+
+_sync_thread = None
+_sync_lock = threading.Lock()
+
+def start_background_sync(interval=SYNC_INTERVAL):
+    """Start (once per process) the thread that polls the sheet revision."""
+    global _sync_thread
+    with _sync_lock:
+        if _sync_thread is None:
+            _sync_thread = threading.Thread(target=_background_sync, args=(interval,), daemon=True, name="sheet-sync")
+            _sync_thread.start()
+
+# --- SHARED CONNECTION ---
+def _materialize(con, name, df, schema=None):
+    if df is None or len(df.columns) == 0:
+        con.execute(f"CREATE TABLE {name} ({TABLE_SCHEMAS[schema or name]})")
+        return
+    try:
+        con.register('__src', df)
+        con.execute(f"CREATE TABLE {name} AS SELECT * FROM __src")
+    except duckdb.Error:
+        con.unregister('__src')
+        con.register('__src', _stringify_objects(df))
+        con.execute(f"CREATE TABLE {name} AS SELECT * FROM __src")
+    finally:
+        con.unregister('__src')
+
+def _stage_replacement(cur, delta):
+    cur.execute(f"DROP TABLE IF EXISTS {delta.name}__new")
+    _materialize(cur, f"{delta.name}__new", _cast_table(delta.name, delta.replace), schema=delta.name)
+
+def _apply_delta(cur, delta):
+    name = delta.name
+    if delta.replace is not None:
+        # built by _stage_replacement; swapped in here so readers never see the table missing
+        cur.execute(f"DROP TABLE IF EXISTS {name}")
+        cur.execute(f"ALTER TABLE {name}__new RENAME TO {name}")
+    if delta.append is not None and not delta.append.empty:
+        cur.register('__delta', _cast_table(name, delta.append))
+        cur.execute(f"INSERT INTO {name} BY NAME SELECT * FROM __delta")
+        cur.unregister('__delta')
+    if delta.update is not None and not delta.update.empty:
+        cols = [c for c in delta.update.columns if c != delta.key]
+        sets = ", ".join(f"{c} = __delta.{c}" for c in cols)
+        cur.register('__delta', _cast_table(name, delta.update))
+        cur.execute(f"UPDATE {name} SET {sets} FROM __delta WHERE {name}.{delta.key} = __delta.{delta.key}")
+        cur.unregister('__delta')
+
+# --- DERIVED TABLES ---
+# Integer month of a review timestamp: year * 100 + month (2019-05 -> 201905)
+_MONTH_KEY_SQL = "CAST(year({ts}) * 100 + month({ts}) AS INTEGER)"
+
+# Aggregates served next to the base tables. Each is rebuilt whenever one of
+# its source tables changes, under the same lock as the change, so it always
+# matches the current data version.
+DERIVED_TABLES = {
+    # one row per reviewer_id that has reviews
+    'reviewer_stats': (['reviews'], """
+        SELECT reviewer_id,
+               COUNT(*) AS review_count,
+               COUNT(DISTINCT restaurant_id) AS distinct_shops_visited,
+               COUNT(*) - COUNT(DISTINCT restaurant_id) AS revisit_count,
+               AVG(rating) AS avg_rating_given,
+               MAX(timestamp) AS last_review,
+               COUNT(*) FILTER (WHERE rating = 1) AS rating_1,
+               COUNT(*) FILTER (WHERE rating = 2) AS rating_2,
+               COUNT(*) FILTER (WHERE rating = 3) AS rating_3,
+               COUNT(*) FILTER (WHERE rating = 4) AS rating_4,
+               COUNT(*) FILTER (WHERE rating = 5) AS rating_5
+        FROM reviews
+        WHERE reviewer_id IS NOT NULL
+        GROUP BY reviewer_id
+    """),
+    # restaurants a reviewer reviewed more than once
+    'reviewer_revisits': (['reviews'], """
+        SELECT reviewer_id, restaurant_id, COUNT(*) AS visit_count, MAX(timestamp) AS last_visit
+        FROM reviews
+        WHERE reviewer_id IS NOT NULL
+        GROUP BY reviewer_id, restaurant_id
+        HAVING COUNT(*) > 1
+    """),
+    # (restaurant, month, rating) counts behind the restaurant page charts;
+    # month_key is NULL when the review has no timestamp
+    'restaurant_rating_cube': (['reviews'], f"""
+        SELECT restaurant_id, {_MONTH_KEY_SQL.format(ts='timestamp')} AS month_key, rating,
+               COUNT(*) AS cnt, SUM(rating) AS rating_sum
+        FROM reviews
+        GROUP BY ALL
+        ORDER BY restaurant_id, month_key, rating
+    """),
+}
+
+def _refresh_derived(con, changed=None):
+    """Rebuild the derived tables depending on `changed` (all of them when None)."""
+    for name, (sources, sql) in DERIVED_TABLES.items():
+        if changed is None or set(sources) & set(changed):
+            con.execute(f"CREATE OR REPLACE TABLE {name} AS {sql}")
+
+class SharedConnection:
+    """
+    Process-wide DuckDB database shared by every Streamlit session.
+    The snapshot tables are copied into native tables once per data version
+    and each thread gets its own cursor on top of the same database.
+    Sync deltas and local writes patch the live tables in place.
+    """
+    def __init__(self):
+        self.version = 0
+        self._con = None
+        self._stale = True
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def invalidate(self):
+        """Mark the current tables as outdated; the next cursor() rebuilds them."""
+        self._stale = True
+
+    def _needs_build(self):
+        return self._con is None or self._stale
+
+    def _build(self):
+        self._stale = False
+        data = load_data()
+        con = duckdb.connect(database=':memory:')
+        for name in TABLE_SCHEMAS:
+            _materialize(con, name, data.get(name))
+        _refresh_derived(con)
+        # Swap in one step: threads still holding the old cursor finish on the old tables
+        self._con = con
+        self.version += 1
+        start_background_sync()
+
+    def cursor(self):
+        if self._needs_build():
+            with self._lock:
+                if self._needs_build():
+                    self._build()
+        local = self._local
+        if getattr(local, 'con', None) is not self._con:
+            local.cursor = self._con.cursor()
+            local.con = self._con
+        return local.cursor
+
+    def read_table(self, name):
+        return self.cursor().execute(f"SELECT * FROM {name}").df()
+
+    def write(self, fn, persist=()):
+        """
+        Run fn(cursor) against the live tables, bump the data version and
+        rewrite the `persist` tables in the snapshot. Serialized with rebuilds
+        so a rebuild never reads a snapshot that misses a patch.
+        Derived tables are refreshed from the `persist` tables.
+        """
+        self.cursor()
+        with self._lock:
+            cur = self._con.cursor()
+            fn(cur)
+            _refresh_derived(cur, persist)
+            self.version += 1
+            if persist:
+                self.persist(persist)
+
+    def persist(self, names):
+        """Rewrite the given tables of the snapshot from the live database."""
+        if not names:
+            return
+        self.cursor()
+        with self._lock:
+            cur = self._con.cursor()
+            snapshot.save_snapshot({name: cur.execute(f"SELECT * FROM {name}").df() for name in names}, partial=True)
+
+    def apply_deltas(self, deltas):
+        """Patch the live tables with sheet_sync deltas; returns the changed tables."""
+        if not deltas:
+            return {}
+        self.cursor()
+        with self._lock:
+            cur = self._con.cursor()
+            for delta in deltas:
+                if delta.replace is not None:
+                    _stage_replacement(cur, delta)
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                for delta in deltas:
+                    _apply_delta(cur, delta)
+                _refresh_derived(cur, [d.name for d in deltas])
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            self.version += 1
+            return {d.name: cur.execute(f"SELECT * FROM {d.name}").df() for d in deltas}
+
+_shared = SharedConnection()
 
 def get_db():
-    data = load_data()
-    con = duckdb.connect(database=':memory:')
-    if data:
-        for name, df in data.items():
-            con.register(name, df)
-    return con
+    return _shared.cursor()
 
-def trigger_refresh():
-    load_data.clear()
+def get_data_version():
+    """Bumped whenever the tables served by get_db() change."""
+    _shared.cursor()
+    return _shared.version
 
 # --- WRITE OPERATIONS ---
+# Follow / unfollow is applied to the local tables (and snapshot) immediately and queued;
+# write_queue pushes the coalesced changes to the sheet with batch_update.
+def _flush_pending_writes(follower_deltas, followed_lists):
+    sh = connect_gsheet()
+    if not sh:
+        raise RuntimeError("Google Sheets unavailable")
+
+    if follower_deltas:
+        ws = sh.worksheet('reviewers')
+        targets = [(rid, _pool.row_of('reviewers', rid)) for rid in follower_deltas]
+        targets = [(rid, row) for rid, row in targets if row]
+        current = ws.batch_get([f"D{row}" for _, row in targets])
+        updates = []
+        for (rid, row), cur in zip(targets, current):
+            try: cur_val = int(cur[0][0])
+            except: cur_val = 0
+            updates.append({'range': f"D{row}", 'values': [[max(0, cur_val + follower_deltas[rid])]]})
+        if updates:
+            ws.batch_update(updates)
+
+    if followed_lists:
+        ws_users = sh.worksheet('users')
+        # Prepend apostrophe (') so Sheets keeps "1,2" as text instead of a number or date
+        updates = []
+        for uid, ids in followed_lists.items():
+            row = _pool.row_of('users', uid)
+            if row:
+                updates.append({'range': f"E{row}", 'values': [["'" + ",".join(map(str, ids))]]})
+        if updates:
+            ws_users.batch_update(updates, value_input_option='USER_ENTERED')
+
+# Flushed by its own thread, by sync_snapshot and at interpreter exit (write_queue)
+_write_queue = write_queue.WriteQueue(_flush_pending_writes)
+
 def update_reviewer_follower_count(reviewer_id: int, increment: bool = True):
     try:
-        sh = connect_gsheet()
-        if not sh: return False
-        ws = sh.worksheet('reviewers')
-        cell = ws.find(str(reviewer_id), in_column=1) 
-        if cell:
-            row = cell.row
-            cur_val = int(ws.cell(row, 4).value)
-            new_val = cur_val + 1 if increment else max(0, cur_val - 1)
-            ws.update_cell(row, 4, new_val)
-            trigger_refresh()
-            return True
+        delta = 1 if increment else -1
+        _shared.write(lambda cur: cur.execute(
+            "UPDATE reviewers SET followers = GREATEST(followers + ?, 0) WHERE reviewer_id = ?", [delta, reviewer_id]),
+            persist=['reviewers'])
+        _write_queue.add_follower_delta(reviewer_id, delta)
+        return True
     except Exception as e:
         st.error(f"Error updating follower count: {e}")
     return False
 
 def update_user_followed_list(user_id: int, followed_ids_list: list):
     try:
-        sh = connect_gsheet()
-        if not sh: return False
-        ws_users = sh.worksheet('users')
-        cell = ws_users.find(str(user_id), in_column=1)
-        if cell:
-            # FIX: Prepend apostrophe (') to force Google Sheets to treat this as Text
-            # This prevents "1,2" from being interpreted as a number or date
-            val_str = "'" + ",".join(map(str, followed_ids_list))
-            
-            # Use value_input_option='USER_ENTERED' to ensure the apostrophe works correctly
-            ws_users.update_cell(cell.row, 5, val_str) 
-            trigger_refresh()
-            return True
+        followed_str = ",".join(map(str, followed_ids_list))
+        _shared.write(lambda cur: cur.execute(
+            "UPDATE users SET followed_reviewers = ? WHERE id = ?", [followed_str, user_id]),
+            persist=['users'])
+        _write_queue.set_followed_list(user_id, followed_ids_list)
+        return True
     except Exception as e: 
         st.error(f"Error updating user follow list: {e}")
         return False
 
 # --- READ OPERATIONS ---
+# Page-level read helpers are memoized across sessions for the current data
+# version (modules/result_cache.py); any sync or write moves the version.
+_result_cache = result_cache.ResultCache()
+_cached = result_cache.cached(_result_cache, get_data_version)
 
-def search_restaurants_advanced(query, min_rating, min_reviews, sort_by):
-    con = get_db()
-    sql = f"SELECT * FROM restaurants WHERE average_rating >= {min_rating} AND review_count >= {min_reviews}"
+def get_cache_stats():
+    """Hit / miss / size counters of the read-helper cache."""
+    return _result_cache.stats()
+
+def _restaurant_search_sql(query, min_rating, min_reviews, sort_by):
+    """(sql, params) for the restaurant search, or None when the text query has no hits."""
+    sql = f"SELECT * FROM restaurants r WHERE average_rating >= {min_rating} AND review_count >= {min_reviews}"
     params = []
     
     if query:
-        sql += " AND (LOWER(name) LIKE ? OR LOWER(keywords) LIKE ?)"
-        q = f"%{query.lower()}%"
-        params = [q, q]
+        # Ranked full-text hits over name, keywords and review text (modules/search.py)
+        hits = search.search_restaurants(query)
+        if hits.empty:
+            return None
+        sql = f"""SELECT r.* FROM restaurants r
+        JOIN (SELECT unnest(?) AS id, unnest(?) AS score) h ON r.id = h.id
+        WHERE average_rating >= {min_rating} AND review_count >= {min_reviews}"""
+        params = [hits['id'].tolist(), hits['score'].tolist()]
     
-    if sort_by == 'รีวิวมาก -> น้อย':
-        sql += " ORDER BY review_count DESC"
+    # r.id breaks ties so pages never overlap
+    if sort_by == 'ความเกี่ยวข้อง':
+        sql += " ORDER BY h.score DESC, r.id" if query else " ORDER BY review_count DESC, r.id"
+    elif sort_by == 'รีวิวมาก -> น้อย':
+        sql += " ORDER BY review_count DESC, r.id"
     elif sort_by == 'รีวิวน้อย -> มาก':
-        sql += " ORDER BY review_count ASC"
+        sql += " ORDER BY review_count ASC, r.id"
     elif sort_by == 'Rating สูง -> ต่ำ':
-        sql += " ORDER BY average_rating DESC"
+        sql += " ORDER BY average_rating DESC, r.id"
     elif sort_by == 'Rating ต่ำ -> สูง':
-        sql += " ORDER BY average_rating ASC"
-    
+        sql += " ORDER BY average_rating ASC, r.id"
+    else:
+        sql += " ORDER BY r.id"
+    return sql, params
+
+def _fetch_page(sql, params, page, page_size):
+    """One page of `sql` plus the total row count; LIMIT/OFFSET run inside DuckDB."""
+    con = get_db()
+    total = con.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    offset = (max(1, page) - 1) * page_size
+    df = con.execute(f"{sql} LIMIT ? OFFSET ?", params + [page_size, offset]).df()
+    return df, int(total)
+
+def search_restaurants_page(query, min_rating, min_reviews, sort_by, page=1, page_size=5):
+    """Restaurants matching the filters: (one page, total matches)."""
+    built = _restaurant_search_sql(query, min_rating, min_reviews, sort_by)
+    if built is None:
+        return pd.DataFrame(), 0
     try:
-        return con.execute(sql, params).df()
+        return _fetch_page(built[0], built[1], page, page_size)
     except Exception as e: 
+        return pd.DataFrame(), 0
+
+def search_reviews(query, limit=20):
+    """Reviews whose text best matches the query, with the restaurant name."""
+    hits = search.search_reviews(query, limit)
+    if hits.empty:
+        return pd.DataFrame()
+    try:
+        sql = """
+        SELECT r.*, res.name as restaurant_name, h.score
+        FROM reviews r
+        JOIN (SELECT unnest(?) AS id, unnest(?) AS score) h ON r.id = h.id
+        LEFT JOIN restaurants res ON r.restaurant_id = res.id
+        ORDER BY h.score DESC, r.id
+        """
+        return get_db().execute(sql, [hits['id'].tolist(), hits['score'].tolist()]).df()
+    except:
         return pd.DataFrame()
 
-def search_reviewers_advanced(query, min_reviews, min_followers, has_revisit, sort_by):
-    con = get_db()
+def _reviewer_search_sql(query, min_reviews, min_followers, has_revisit, sort_by):
+    """(sql, params) for the reviewer search; shop / revisit counts come from reviewer_stats."""
     sql = """
-    SELECT r.*, 
-           (SELECT COUNT(DISTINCT restaurant_id) FROM reviews WHERE reviewer_name = r.name) as distinct_shops_visited
+    SELECT r.*, COALESCE(s.distinct_shops_visited, 0) as distinct_shops_visited
     FROM reviewers r 
+    LEFT JOIN reviewer_stats s ON r.reviewer_id = s.reviewer_id
     WHERE 1=1
     """
     params = []
     
     if query:
-        sql += " AND (LOWER(name) LIKE ?)"
+        sql += " AND (LOWER(r.name) LIKE ?)"
         q = f"%{query.lower()}%"
         params.append(q)
         
     if min_reviews > 0:
-        sql += f" AND total_reviews >= {min_reviews}"
+        sql += f" AND r.total_reviews >= {min_reviews}"
         
     if min_followers > 0:
-        sql += f" AND followers >= {min_followers}"
+        sql += f" AND r.followers >= {min_followers}"
         
     if has_revisit:
-        revisit_sql = """
-        SELECT DISTINCT reviewer_name 
-        FROM reviews 
-        GROUP BY reviewer_name, restaurant_id 
-        HAVING COUNT(*) > 1
-        """
-        sql += f" AND name IN ({revisit_sql})"
+        sql += " AND s.revisit_count > 0"
 
     if sort_by == 'จำนวนรีวิว':
-        sql += " ORDER BY total_reviews DESC"
+        sql += " ORDER BY r.total_reviews DESC, r.reviewer_id"
     elif sort_by == 'จำนวนร้านที่รีวิว':
-        sql += " ORDER BY distinct_shops_visited DESC"
+        sql += " ORDER BY distinct_shops_visited DESC, r.reviewer_id"
     elif sort_by == 'จำนวนผู้ติดตาม':
-        sql += " ORDER BY followers DESC"
+        sql += " ORDER BY r.followers DESC, r.reviewer_id"
     else:
-        sql += " ORDER BY followers DESC"
+        sql += " ORDER BY r.followers DESC, r.reviewer_id"
+    return sql, params
 
+def search_reviewers_page(query, min_reviews, min_followers, has_revisit, sort_by, page=1, page_size=4):
+    """Reviewers matching the filters: (one page, total matches)."""
     try:
-        return con.execute(sql, params).df()
+        sql, params = _reviewer_search_sql(query, min_reviews, min_followers, has_revisit, sort_by)
+        return _fetch_page(sql, params, page, page_size)
     except Exception as e: 
-        return pd.DataFrame()
+        return pd.DataFrame(), 0
 
-def get_revisited_restaurants(reviewer_name):
-    con = get_db()
+@_cached
+def get_reviewer_stats(reviewer_id):
+    """Row of reviewer_stats as a dict (None if the reviewer has no reviews)."""
+    try: return get_db().execute("SELECT * FROM reviewer_stats WHERE reviewer_id=?", [reviewer_id]).df().iloc[0].to_dict()
+    except: return None
+
+@_cached
+def get_revisited_restaurants(reviewer_id):
     try:
         query = """
-        SELECT restaurant_id, COUNT(*) as visit_count, MAX(timestamp) as last_visit
-        FROM reviews
-        WHERE reviewer_name = ?
-        GROUP BY restaurant_id
-        HAVING visit_count > 1
-        ORDER BY visit_count DESC
+        SELECT v.restaurant_id, v.visit_count, v.last_visit, res.id, res.name, res.average_rating
+        FROM reviewer_revisits v
+        LEFT JOIN restaurants res ON v.restaurant_id = res.id
+        WHERE v.reviewer_id = ?
+        ORDER BY v.visit_count DESC, v.restaurant_id
         """
-        df = con.execute(query, [reviewer_name]).df()
-        if not df.empty:
-            rest_ids = tuple(df['restaurant_id'].tolist())
-            if not rest_ids: return pd.DataFrame()
-            rest_ids_str = f"({rest_ids[0]})" if len(rest_ids) == 1 else str(rest_ids)
-            res_info = con.execute(f"SELECT id, name, average_rating FROM restaurants WHERE id IN {rest_ids_str}").df()
-            return df.merge(res_info, left_on='restaurant_id', right_on='id', how='left')
-        return pd.DataFrame()
+        return get_db().execute(query, [reviewer_id]).df()
     except: 
         return pd.DataFrame()
 
+@_cached
 def get_restaurant_reviews_stats(res_id):
+    """(rating distribution, monthly average) sliced from restaurant_rating_cube."""
     con = get_db()
     try:
         # Distribution
-        dist_query = "SELECT rating, COUNT(*) as cnt FROM reviews WHERE restaurant_id = ? GROUP BY rating ORDER BY rating DESC"
+        dist_query = """
+            SELECT rating, CAST(SUM(cnt) AS BIGINT) as cnt FROM restaurant_rating_cube
+            WHERE restaurant_id = ? GROUP BY rating ORDER BY rating DESC
+        """
         dist_df = con.execute(dist_query, [res_id]).df()
         
         # Monthly Avg
         ts_query = """
-            SELECT strftime('%Y-%m', timestamp) as month_year, AVG(rating) as avg_rating
-            FROM reviews WHERE restaurant_id = ? AND timestamp IS NOT NULL
-            GROUP BY month_year ORDER BY month_year
+            SELECT month_key, printf('%04d-%02d', month_key // 100, month_key % 100) as month_year,
+                   SUM(rating_sum) / SUM(cnt) as avg_rating
+            FROM restaurant_rating_cube WHERE restaurant_id = ? AND month_key IS NOT NULL
+            GROUP BY month_key ORDER BY month_key
         """
         ts_df = con.execute(ts_query, [res_id]).df()
         return dist_df, ts_df
     except: 
         return pd.DataFrame(), pd.DataFrame()
 
+@_cached
 def get_restaurant_detail(rid): 
     try: return get_db().execute("SELECT * FROM restaurants WHERE id=?", [rid]).df().iloc[0].to_dict()
     except: return None
     
+@_cached
 def get_reviewer_detail(rid): 
     try: return get_db().execute("SELECT * FROM reviewers WHERE reviewer_id=?", [rid]).df().iloc[0].to_dict()
     except: return None
     
+# Reviews reference reviewers by reviewer_id; the reviewers table is the
+# single place names are stored, the reviews.reviewer_name column only
+# mirrors the sheet (and is used when a row has no reviewer_id).
+@_cached
 def get_reviews_for_restaurant(rid): 
     try: 
         query = """
-        SELECT r.*, rev.reviewer_id 
+        SELECT r.* EXCLUDE (reviewer_name), COALESCE(rev.name, r.reviewer_name) as reviewer_name,
+               {month_key} as month_key
         FROM reviews r
-        LEFT JOIN reviewers rev ON r.reviewer_name = rev.name
+        LEFT JOIN reviewers rev ON r.reviewer_id = rev.reviewer_id
         WHERE r.restaurant_id=? 
         ORDER BY r.timestamp DESC
-        """
+        """.format(month_key=_MONTH_KEY_SQL.format(ts='r.timestamp'))
         return get_db().execute(query, [rid]).df()
     except Exception as e: 
         return pd.DataFrame()
 
-def get_reviews_by_reviewer_name(reviewer_name): 
+@_cached
+def get_reviews_by_reviewer(reviewer_id): 
     try: 
-        query = "SELECT r.*, res.name as restaurant_name FROM reviews r JOIN restaurants res ON r.restaurant_id = res.id WHERE r.reviewer_name = ? ORDER BY r.timestamp DESC"
-        return get_db().execute(query, [reviewer_name]).df()
+        query = "SELECT r.*, res.name as restaurant_name FROM reviews r JOIN restaurants res ON r.restaurant_id = res.id WHERE r.reviewer_id = ? ORDER BY r.timestamp DESC"
+        return get_db().execute(query, [reviewer_id]).df()
     except: return pd.DataFrame()
     
-def get_average_rating_given(reviewer_name): 
+@_cached
+def get_average_rating_given(reviewer_id): 
     try: 
-        avg = get_db().execute("SELECT AVG(rating) FROM reviews WHERE reviewer_name=?", [reviewer_name]).fetchone()[0]
-        return avg if avg is not None else 0.0
+        row = get_db().execute("SELECT avg_rating_given FROM reviewer_stats WHERE reviewer_id=?", [reviewer_id]).fetchone()
+        return row[0] if row and row[0] is not None else 0.0
     except: return 0.0
 
+@_cached
 def get_all_restaurants_light():
     """Get just ID and Name for Dropdowns."""
     try:
@@ -268,67 +674,213 @@ def get_all_restaurants_light():
     except:
         return pd.DataFrame()
 
-# --- SIMILARITY ---
-def calculate_similarity_restaurants(target_res_id, top_n=5):
-    con = get_db()
+# --- REVIEW ASPECTS ---
+# Keywords and food / service / ambience / price scores of every restaurant
+# (modules/aspects.py), extracted from all reviews in one pass when the
+# snapshot is written or synced and kept in the snapshot artifacts.
+def _extract_aspects():
+    return aspects.extract(get_db().execute("SELECT restaurant_id, rating, content FROM reviews").df())
+
+_aspect_table = snapshot.ArtifactCache(
+    aspects.ARTIFACT_NAME, get_data_version, lambda: aspects.fingerprint(get_db()),
+    lambda: _extract_aspects().set_index('restaurant_id'),
+    to_frame=lambda df: df.reset_index(), from_frame=lambda df: df.set_index('restaurant_id'))
+
+def get_aspect_table():
+    """aspects.extract() of the current reviews, indexed by restaurant_id."""
+    return _aspect_table.get()
+
+def get_restaurant_aspects(rid):
+    """{'keywords': str, 'aspects': {aspect: (avg rating, mentions)}} of a restaurant, or None."""
     try:
-        all_res = con.execute("SELECT id, name, average_rating, keywords FROM restaurants WHERE id != ?", [target_res_id]).df()
-        if all_res.empty: return pd.DataFrame()
-        all_res['similarity'] = all_res['average_rating'] / 5.0 + np.random.rand(len(all_res)) * 0.1
-        all_res = all_res.sort_values('similarity', ascending=False).head(top_n)
-        return all_res.rename(columns={'id': 'restaurant_id'})
-    except: return pd.DataFrame()
+        row = get_aspect_table().loc[int(rid)]
+    except Exception:
+        return None
+    found = {a: (float(row[f"{a}_score"]), int(row[f"{a}_mentions"])) for a in aspects.ASPECTS
+             if row[f"{a}_mentions"] >= aspects.MIN_MENTIONS and not pd.isna(row[f"{a}_score"])}
+    return {'keywords': row['keywords'], 'aspects': found}
 
-def get_similar_reviewers_content_based(target_rev_id, top_n=5):
-    con = get_db()
+# --- CARD LISTS ---
+# Many reviewers fetched in one query, in the order of the ids given
+# (unknown ids are left out). Meant for pages rendering a list of cards
+# instead of calling get_reviewer_detail once per card.
+_LATEST_REVIEW_SQL = """
+    SELECT * FROM reviews WHERE {key} IN (SELECT unnest(?))
+    QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY timestamp DESC NULLS LAST, id DESC) = 1
+"""
+
+def _id_list(ids):
+    return tuple(int(i) for i in ids)
+
+def get_reviewer_cards(reviewer_ids):
+    """Reviewer rows + reviewer_stats + their latest review (latest_* columns)."""
+    return _reviewer_cards(_id_list(reviewer_ids))
+
+@_cached
+def _reviewer_cards(ids):
+    if not ids:
+        return pd.DataFrame()
     try:
-        t_name = con.execute("SELECT name FROM reviewers WHERE reviewer_id = ?", [target_rev_id]).fetchone()
-        if not t_name: return pd.DataFrame()
-        target_name = t_name[0]
-        
-        query = """
-        WITH TargetVisits AS (SELECT restaurant_id FROM reviews WHERE reviewer_name = ?),
-        Overlap AS (
-            SELECT r.reviewer_id, r.name, COUNT(*) as common_restaurants, r.followers
-            FROM reviewers r
-            JOIN reviews rv ON r.name = rv.reviewer_name
-            JOIN TargetVisits t ON rv.restaurant_id = t.restaurant_id
-            WHERE r.reviewer_id != ?
-            GROUP BY r.reviewer_id, r.name, r.followers
-        )
-        SELECT * FROM Overlap ORDER BY common_restaurants DESC, followers DESC LIMIT ?
+        query = f"""
+        SELECT rv.*, s.review_count, s.distinct_shops_visited, s.avg_rating_given, s.last_review,
+               lr.restaurant_id as latest_restaurant_id, res.name as latest_restaurant_name,
+               lr.rating as latest_rating, lr.content as latest_content, lr.timestamp as latest_timestamp
+        FROM (SELECT unnest(?) as reviewer_id, unnest(?) as pos) ids
+        JOIN reviewers rv ON rv.reviewer_id = ids.reviewer_id
+        LEFT JOIN reviewer_stats s ON s.reviewer_id = ids.reviewer_id
+        LEFT JOIN ({_LATEST_REVIEW_SQL.format(key='reviewer_id')}) lr ON lr.reviewer_id = ids.reviewer_id
+        LEFT JOIN restaurants res ON res.id = lr.restaurant_id
+        ORDER BY ids.pos
         """
-        return con.execute(query, [target_name, target_rev_id, top_n]).df()
-    except: return pd.DataFrame()
+        return get_db().execute(query, [list(ids), list(range(len(ids))), list(ids)]).df()
+    except:
+        return pd.DataFrame()
 
 # --- OLLAMA INTEGRATION ---
-@st.cache_data(show_spinner=False, ttl=3600)
-def get_ollama_text_response(user_prompt, system_prompt=""):
+# Endpoints, model and options live in modules/llm_gateway.py
+OLLAMA_MODEL = llm_gateway.OLLAMA_MODEL
+# Set to answer with modules/fake_llm.py instead of a local Ollama server
+# ('server' runs the real gateway against an in-process fake Ollama server)
+FAKE_LLM = os.environ.get('TASTE_RANK_FAKE_LLM')
+
+if FAKE_LLM == 'server':
+    _fake_server = fake_llm.FakeOllamaServer().start()
+    _gateway = llm_gateway.LLMGateway(hosts=[_fake_server.host], model='fake')
+else:
+    _gateway = llm_gateway.LLMGateway()
+    if not FAKE_LLM:
+        # load the model on the servers while the app starts up
+        threading.Thread(target=_gateway.warm_up, daemon=True).start()
+
+# LLM calls run on llm_jobs worker threads; identical prompts share one job.
+# As many workers as the gateway's endpoints take at once, so a burst of
+# jobs waits in line; the extractive fallback is left for endpoints that
+# are down.
+_llm_jobs = llm_jobs.LLMJobQueue(fake_llm.FakeChat() if FAKE_LLM and FAKE_LLM != 'server' else _gateway,
+                                 max_concurrent=_gateway.capacity)
+
+_chat_model = 'fake' if FAKE_LLM else OLLAMA_MODEL
+
+def set_chat_backend(backend, model=None):
+    """Route LLM calls to backend(user_prompt, system_prompt) -> str (e.g. fake_llm.FakeChat())."""
+    global _chat_model
+    _llm_jobs.set_backend(backend)
+    _chat_model = model or getattr(backend, 'model', 'custom')
+
+def submit_ai_response(user_prompt, system_prompt=""):
+    """Start (or join) the LLM job for this prompt; returns a Future."""
+    return _llm_jobs.submit(user_prompt, system_prompt)
+
+def stream_ai_response(user_prompt, system_prompt=""):
+    """Start (or join) the job now; returns an iterator of its tokens for st.write_stream."""
+    return llm_jobs.stream_text(submit_ai_response(user_prompt, system_prompt))
+
+def get_llm_stats():
+    stats = {**_llm_jobs.stats(), 'stored_summaries': _summary_store.stats()}
+    if _llm_jobs.backend is _gateway:
+        stats['gateway'] = _gateway.stats()
+    return stats
+
+# --- STORED SUMMARIES ---
+# Entity summaries survive restarts in modules/summary_store.py; the prompt
+# template version of each kind is kept in modules/prompts.py.
+_summary_store = summary_store.SummaryStore()
+
+def _summary_key(kind, entity_id, review_ids):
+    return (kind, entity_id, prompts.TEMPLATE_VERSIONS[kind], _chat_model, summary_store.review_hash(review_ids))
+
+def get_stored_summary(kind, entity_id, review_ids):
+    """Stored summary for exactly these reviews, template and model; None otherwise."""
+    return _summary_store.get(*_summary_key(kind, entity_id, review_ids))
+
+def _store(key, text):
+    kind = key[0]
+    _summary_store.put(*key, text, prompts.parse_summary(kind, text))
+
+def store_summary(kind, entity_id, review_ids, text):
+    _store(_summary_key(kind, entity_id, review_ids), text)
+
+def _submit_summary(key, user_prompt, system_prompt=""):
+    """Job for a summary that is stored (with its parsed fields) once it is done."""
+    def store(future):
+        # extractive fallbacks (llm_gateway) are shown but not kept
+        if future.exception() is None and not getattr(future.result(), 'fallback', False):
+            _store(key, future.result())
+
+    return _llm_jobs.submit(user_prompt, system_prompt, on_done=store)
+
+def stream_entity_summary(kind, entity_id, review_ids, user_prompt, system_prompt=""):
     """
-    Calls Ollama local API with caching.
+    The stored summary while the entity's review ids are unchanged, or else
+    the tokens of its job as they are generated (the finished text is stored
+    when the job ends). The job is started right away, before the iterator
+    is consumed.
     """
-    if chat is None:
-        return "Error: Ollama library not installed."
-        
-    try:
-        options = {
-            'temperature': 0.1,
-            'top_p': 0.5,
-            'repeat_penalty': 1.2,
-            'num_ctx': 4096
-        }
-
-        response: ChatResponse = chat(
-            model='gemma3:1b', 
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_prompt},
-            ],
-            options=options
-        )
-        
-        if response and response.message:
-            return response.message.content
-        return "No response from AI."
-    except Exception as e:
-        return f"AI Error: {str(e)}."
\ No newline at end of file
+    key = _summary_key(kind, entity_id, review_ids)
+    stored = _summary_store.get(*key)
+    if stored is not None:
+        return iter([stored])
+    return llm_jobs.stream_text(_submit_summary(key, user_prompt, system_prompt))
+
+# --- COMPARE ---
+def get_restaurant_analyses(rids):
+    """
+    {rid: (review ids, fields)} of prompts.parse_restaurant_summary for each
+    restaurant; (None, None) when it has too few reviews. Stored fields are
+    used as they are, the missing analyses all run at once and are waited for.
+    The review ids are None as well when the analysis failed or is an
+    extractive fallback, so its fields are only placeholders.
+    """
+    result, pending = {}, {}
+    for rid in rids:
+        built = prompts.restaurant_summary_prompt(get_reviews_for_restaurant(rid))
+        if built is None:
+            result[rid] = (None, None)
+            continue
+        review_ids, user_prompt = built
+        key = _summary_key('restaurant', rid, review_ids)
+        fields = _summary_store.get_fields(*key)
+        if fields is None:
+            stored = _summary_store.get(*key)
+            if stored is not None:  # stored before fields were kept
+                fields = prompts.parse_restaurant_summary(stored)
+        if fields is not None:
+            result[rid] = (review_ids, fields)
+        else:
+            pending[rid] = (review_ids, _submit_summary(key, user_prompt))
+    for rid, (review_ids, future) in pending.items():
+        text = llm_jobs.format_result(future)
+        if future.exception() is not None or getattr(text, 'fallback', False):
+            review_ids = None
+        result[rid] = (review_ids, prompts.parse_restaurant_summary(text))
+    return result
+
+def stream_compare_verdict(restaurant_a, analysis_a, restaurant_b, analysis_b):
+    """
+    Tokens of the verdict for two restaurants (detail dicts, get_restaurant_analyses
+    entries). Stored once per unordered pair until either one's reviews change,
+    but only when both analyses are real summaries; a verdict built on
+    placeholder fields is streamed without being kept.
+    """
+    (ids_a, fields_a), (ids_b, fields_b) = analysis_a, analysis_b
+    user_prompt = prompts.compare_verdict_prompt(restaurant_a, fields_a or {}, restaurant_b, fields_b or {})
+    if ids_a is None or ids_b is None:
+        return stream_ai_response(user_prompt)
+    pair = summary_store.pair_key(restaurant_a['id'], restaurant_b['id'])
+    key = _summary_key('compare', pair, tuple(ids_a) + tuple(ids_b))
+    stored = _summary_store.get(*key)
+    if stored is not None:
+        return iter([stored])
+    return llm_jobs.stream_text(_submit_summary(key, user_prompt))
+
+def chat_once(user_prompt, system_prompt="", stats=None):
+    """
+    Blocking call to the current chat backend, outside the job queue (for
+    batch jobs that run their own workers). Through the gateway it waits for
+    a free server rather than falling back, and `stats` receives Ollama's
+    token counts (prompt_tokens, output_tokens); other backends leave it empty.
+    """
+    backend = _llm_jobs.backend
+    if backend is _gateway:
+        return _gateway.wait_call(user_prompt, system_prompt, stats)
+    return backend(user_prompt, system_prompt)
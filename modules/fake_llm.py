@@ -0,0 +1,135 @@
+#modules/fake_llm.py
+"""
+Stand-in for the Ollama chat call, for tests and running without a model.
+
+FakeChat answers with the prompt's own "Format:" template, every [...]
+placeholder filled with a fixed text, after an optional delay (streamed
+word by word when an on_token callback is given). Calls are
+recorded so tests can check how often the model would have been hit.
+Use it through db_manager.set_chat_backend(FakeChat()) or by setting the
+TASTE_RANK_FAKE_LLM environment variable. FakeOllamaServer serves FakeChat
+over HTTP like an Ollama server, to exercise modules/llm_gateway.py
+(TASTE_RANK_FAKE_LLM=server).
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PLACEHOLDER_RE = re.compile(r"\[[^\]]*\]")
+
+class FakeChat:
+    model = 'fake'
+
+    def __init__(self, delay=0.0, answer="ข้อมูลทดสอบ"):
+        self.delay = delay
+        self.answer = answer
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, user_prompt, system_prompt="", on_token=None):
+        with self._lock:
+            self.calls.append((user_prompt, system_prompt))
+        text = self.respond(user_prompt)
+        if on_token is None:
+            if self.delay:
+                time.sleep(self.delay)
+            return text
+        # streamed word by word, the delay spread over the words
+        tokens = re.findall(r"\S+\s*|\s+", text)
+        for token in tokens:
+            if self.delay:
+                time.sleep(self.delay / len(tokens))
+            on_token(token)
+        return text
+
+    def respond(self, user_prompt):
+        lines = user_prompt.splitlines()
+        for i, line in enumerate(lines):
+            if line.strip().endswith("Format:"):
+                template = [l.strip() for l in lines[i + 1:] if l.strip()]
+                if template:
+                    return "\n".join(_PLACEHOLDER_RE.sub(self.answer, l) for l in template)
+        return self.answer
+
+class FakeOllamaServer:
+    """
+    In-process HTTP server speaking the bits of the Ollama API the app uses
+    (/api/chat, streamed or not, and /api/generate for warm-up), answering
+    with FakeChat. Lets llm_gateway run against real ollama.Client objects:
+
+        server = FakeOllamaServer(delay=0.5).start()
+        gateway = LLMGateway(hosts=[server.host])
+        ...
+        server.stop()
+    """
+    def __init__(self, delay=0.0, answer="ข้อมูลทดสอบ", fail=False):
+        self.chat = FakeChat(delay, answer)
+        self.fail = fail
+        self._httpd = None
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body, content_type="application/json", status=200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if server.fail:
+                    return self._send(json.dumps({"error": "fake server failure"}).encode(), status=500)
+                if self.path == "/api/generate":
+                    return self._send(json.dumps({"model": request.get("model"), "response": "", "done": True}).encode())
+                if self.path != "/api/chat":
+                    return self._send(b'{"error": "not found"}', status=404)
+                messages = request.get("messages", [])
+                user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+                system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+                model = request.get("model")
+                if not request.get("stream", True):
+                    text = server.chat(user, system)
+                    return self._send(json.dumps(_chat_message(model, text, user, done=True)).encode())
+                # streamed as chunked NDJSON, one line per token as FakeChat produces it
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                def send_line(message):
+                    line = (json.dumps(message) + "\n").encode()
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                    self.wfile.flush()
+                text = server.chat(user, system, on_token=lambda t: send_line(_chat_message(model, t, user)))
+                send_line(_chat_message(model, "", user, done=True) | {"eval_count": len(text.split())})
+                self.wfile.write(b"0\r\n\r\n")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+def _chat_message(model, content, user_prompt, done=False):
+    message = {"model": model, "message": {"role": "assistant", "content": content}, "done": done}
+    if done:
+        message.update(prompt_eval_count=len(user_prompt.split()), eval_count=len(content.split()))
+    return message
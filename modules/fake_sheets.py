@@ -0,0 +1,184 @@
+#modules/fake_sheets.py
+"""
+In-memory stand-in for a gspread client, built from the Kaggle CSV.
+Use it to run the app or the data layer without Google credentials:
+
+    db_manager.set_sheet_client(FakeSheetClient('data/source_reviews.csv'))
+"""
+import os
+import re
+import time
+import pandas as pd
+
+HEADERS = {
+    'restaurants': ['id', 'name', 'average_rating', 'review_count', 'keywords', 'metadata'],
+    'reviews': ['id', 'restaurant_id', 'reviewer_name', 'rating', 'content', 'timestamp', 'pictures', 'reviewer_id'],
+    'reviewers': ['reviewer_id', 'name', 'total_reviews', 'followers'],
+    'users': ['id', 'username', 'email', 'password_hash', 'followed_reviewers'],
+}
+
+DEFAULT_USERS = [
+    [1, 'admin', 'admin@example.com', '$2b$12$EXAMPLEHASH...', ''],
+    [2, 'demo_user', 'demo@test.com', 'pass123', '1,3,5'],
+]
+
+def _numericise(value):
+    """Mimic how the Sheets API hands back cell values."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    if isinstance(value, str):
+        try:
+            num = float(value)
+            return int(num) if num.is_integer() else num
+        except ValueError:
+            return value
+    return value
+
+def _a1_to_rowcol(label):
+    """'C12' -> (12, 3); a bare column ('C') gives row None."""
+    match = re.match(r'([A-Z]+)(\d*)', label.upper())
+    col = 0
+    for ch in match.group(1):
+        col = col * 26 + ord(ch) - 64
+    return (int(match.group(2)) if match.group(2) else None), col
+
+def _parse_followers(meta):
+    match = re.search(r'(\d+)\s*Follower', str(meta))
+    return int(match.group(1)) if match else 0
+
+def build_sheet_rows(csv_path):
+    """Return {sheet: [header, *rows]} laid out the way seed_data.py uploads them, with formulas evaluated."""
+    df = pd.read_csv(csv_path)
+    df['Time'] = pd.to_datetime(df['Time'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+    rating_num = pd.to_numeric(df['Rating'], errors='coerce')
+
+    res_names = sorted(df['Restaurant'].dropna().unique())
+    res_id_map = {name: i + 1 for i, name in enumerate(res_names)}
+    rev_names = sorted(df['Reviewer'].dropna().unique())
+    rev_id_map = {name: i + 1 for i, name in enumerate(rev_names)}
+    df['restaurant_id'] = df['Restaurant'].map(res_id_map)
+    df['reviewer_id'] = df['Reviewer'].map(rev_id_map)
+
+    res_avg = rating_num.groupby(df['restaurant_id']).mean()
+    res_cnt = df.groupby('restaurant_id').size()
+    res_meta = df.groupby('restaurant_id')['Metadata'].first()
+    restaurants = [
+        [rid, name, round(float(res_avg.get(rid, 0) or 0), 2), int(res_cnt.get(rid, 0)), '', res_meta.get(rid, '')]
+        for name, rid in res_id_map.items()
+    ]
+
+    rev_cnt = df.groupby('reviewer_id').size()
+    rev_meta = df.groupby('reviewer_id')['Metadata'].first()
+    reviewers = [
+        [rid, name, int(rev_cnt.get(rid, 0)), _parse_followers(rev_meta.get(rid, ''))]
+        for name, rid in rev_id_map.items()
+    ]
+
+    reviews = [
+        [i + 1, row.restaurant_id, row.Reviewer, row.Rating, row.Review, row.Time, row.Pictures, row.reviewer_id]
+        for i, row in enumerate(df.itertuples(index=False))
+    ]
+
+    rows = {'restaurants': restaurants, 'reviews': reviews, 'reviewers': reviewers, 'users': DEFAULT_USERS}
+    return {name: [HEADERS[name]] + [[_numericise(v) for v in r] for r in data] for name, data in rows.items()}
+
+class Cell:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = rows
+
+    def get_all_records(self, numericise_ignore=None):
+        header = self.rows[0]
+        ignore = {i - 1 for i in (numericise_ignore or [])}
+        records = []
+        for r in self.rows[1:]:
+            r = list(r) + [''] * (len(header) - len(r))
+            records.append({h: (str(v) if i in ignore and v != '' else v) for i, (h, v) in enumerate(zip(header, r))})
+        return records
+
+    def col_values(self, col):
+        values = [r[col - 1] if col - 1 < len(r) else '' for r in self.rows]
+        while values and values[-1] == '':
+            values.pop()
+        return [str(v) for v in values]
+
+    def row_values(self, row):
+        return [str(v) for v in self.rows[row - 1]] if row - 1 < len(self.rows) else []
+
+    def get(self, range_name):
+        start, _, end = range_name.partition(':')
+        r1, c1 = _a1_to_rowcol(start)
+        r2, c2 = _a1_to_rowcol(end or start)
+        r1 = r1 or 1
+        r2 = r2 or len(self.rows)
+        return [[str(v) for v in r[c1 - 1:c2]] for r in self.rows[r1 - 1:r2]]
+
+    def batch_get(self, ranges):
+        return [self.get(r) for r in ranges]
+
+    def batch_update(self, data, raw=True, value_input_option=None):
+        user_entered = value_input_option == 'USER_ENTERED' or not raw
+        for item in data:
+            row, col = _a1_to_rowcol(item['range'].split(':')[0])
+            for i, values in enumerate(item['values']):
+                for j, v in enumerate(values):
+                    if user_entered:
+                        self.update_cell(row + i, col + j, v)
+                    else:
+                        self._set(row + i, col + j, v)
+
+    def find(self, query, in_column=None):
+        for i, r in enumerate(self.rows):
+            cols = [in_column - 1] if in_column else range(len(r))
+            for c in cols:
+                if c < len(r) and str(r[c]) == str(query):
+                    return Cell(i + 1, c + 1, r[c])
+        return None
+
+    def cell(self, row, col):
+        r = self.rows[row - 1] if row - 1 < len(self.rows) else []
+        return Cell(row, col, str(r[col - 1]) if col - 1 < len(r) else None)
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        r = self.rows[row - 1]
+        r.extend([''] * (col - len(r)))
+        r[col - 1] = value
+        self.spreadsheet.touch()
+
+    def update_cell(self, row, col, value):
+        # USER_ENTERED semantics: a leading apostrophe forces the cell to text
+        if isinstance(value, str) and value.startswith("'"):
+            self._set(row, col, value[1:])
+        else:
+            self._set(row, col, _numericise(value))
+
+class FakeSpreadsheet:
+    def __init__(self, sheets, updated=None):
+        self._sheets = {name: FakeWorksheet(self, name, rows) for name, rows in sheets.items()}
+        self._updated = updated if updated is not None else time.time()
+
+    def touch(self):
+        self._updated = time.time()
+
+    def worksheet(self, title):
+        return self._sheets[title]
+
+    def get_lastUpdateTime(self):
+        return f"{self._updated:.6f}"
+
+class FakeSheetClient:
+    """Stands in for the object returned by gspread.authorize()."""
+    def __init__(self, csv_path='data/source_reviews.csv'):
+        self.spreadsheet = FakeSpreadsheet(build_sheet_rows(csv_path), updated=os.path.getmtime(csv_path))
+
+    def open(self, title):
+        return self.spreadsheet
@@ -0,0 +1,261 @@
+#modules/llm_gateway.py
+"""
+Routes chat calls over one or more Ollama servers.
+
+Each endpoint keeps one ollama.Client (and with it a persistent HTTP
+connection pool) for the life of the process, created on its first call so
+a missing library or bad host only fails that call. A call goes to the endpoint
+with the fewest requests in flight; an endpoint that fails is skipped for
+RETRY_AFTER seconds and the call moves on to the next one. Every request
+asks the server to keep the model loaded for KEEP_ALIVE, so it isn't
+reloaded between page views.
+
+When no endpoint can take the call (all of them down, or already holding
+MAX_IN_FLIGHT requests from callers outside the llm_jobs queue, which is
+sized to the gateway's capacity), a summary prompt is answered right away
+with an extractive summary (sentences picked from its own reviews) instead
+of failing; such answers are an ExtractiveSummary (a str) so callers can
+avoid storing them.
+
+Endpoints come from TASTE_RANK_OLLAMA_HOSTS (comma separated, e.g.
+"http://gpu1:11434,http://gpu2:11434"); unset means the local default.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+try:
+    from ollama import Client
+except ImportError:
+    Client = None
+
+# --- CONFIG ---
+OLLAMA_MODEL = os.environ.get('TASTE_RANK_OLLAMA_MODEL', 'gemma3:1b')
+OLLAMA_HOSTS = [h.strip() for h in os.environ.get('TASTE_RANK_OLLAMA_HOSTS', '').split(',') if h.strip()]
+OPTIONS = {
+    'temperature': 0.1,
+    'top_p': 0.5,
+    'repeat_penalty': 1.2,
+    'num_ctx': 4096
+}
+KEEP_ALIVE = '30m'     # how long the server keeps the model loaded after a request
+MAX_IN_FLIGHT = 2      # requests per endpoint before it counts as saturated
+RETRY_AFTER = 30       # seconds a failed endpoint is skipped
+FALLBACK_SENTENCES = 3
+
+class AllBackendsBusy(RuntimeError):
+    pass
+
+class ExtractiveSummary(str):
+    """Fallback answer built from the prompt's reviews, not by the model."""
+    fallback = True
+
+class Backend:
+    """One Ollama endpoint: its client plus load and latency counters."""
+    def __init__(self, host, client_factory):
+        self.host = host
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.in_flight = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.streamed = 0
+        self.first_token_seconds = 0.0
+        self.max_in_flight_seen = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory(self.host)
+        return self._client
+
+    def chat(self, model, user_prompt, system_prompt="", on_token=None, stats=None):
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt},
+        ]
+        if on_token is not None:
+            parts = []
+            last = None
+            start = time.perf_counter()
+            for chunk in self.client.chat(model=model, messages=messages, options=OPTIONS,
+                                          stream=True, keep_alive=KEEP_ALIVE):
+                piece = chunk.message.content if chunk.message else ""
+                if piece:
+                    if not parts:
+                        self.streamed += 1
+                        self.first_token_seconds += time.perf_counter() - start
+                    parts.append(piece)
+                    on_token(piece)
+                last = chunk
+            if stats is not None and last is not None:
+                stats['prompt_tokens'] = last.prompt_eval_count or 0
+                stats['output_tokens'] = last.eval_count or 0
+            return "".join(parts) or "No response from AI."
+
+        response = self.client.chat(model=model, messages=messages, options=OPTIONS, keep_alive=KEEP_ALIVE)
+        if stats is not None and response:
+            stats['prompt_tokens'] = response.prompt_eval_count or 0
+            stats['output_tokens'] = response.eval_count or 0
+        if response and response.message:
+            return response.message.content
+        return "No response from AI."
+
+    def stats(self):
+        done = self.requests - self.failures
+        return {'in_flight': self.in_flight, 'requests': self.requests, 'failures': self.failures,
+                'avg_seconds': round(self.total_seconds / done, 3) if done else None,
+                'avg_first_token_seconds': round(self.first_token_seconds / self.streamed, 3) if self.streamed else None,
+                'max_in_flight': self.max_in_flight_seen,
+                'down': self.down_until > time.time()}
+
+def _ollama_client(host):
+    if Client is None:
+        raise RuntimeError("Ollama library not installed")
+    return Client(host=host)
+
+class LLMGateway:
+    """
+    Chat backend for llm_jobs / db_manager:
+    gateway(user_prompt, system_prompt="", on_token=None) -> str, raises on failure.
+    """
+    def __init__(self, hosts=None, model=OLLAMA_MODEL, max_in_flight=MAX_IN_FLIGHT,
+                 client_factory=_ollama_client, fallback=True):
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.fallback = fallback
+        self.backends = [Backend(h, client_factory) for h in (hosts or OLLAMA_HOSTS or [None])]
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @property
+    def capacity(self):
+        return len(self.backends) * self.max_in_flight
+
+    def _acquire(self, tried):
+        """Least loaded endpoint that is up and not saturated (round robin on ties), or None."""
+        with self._lock:
+            now = time.time()
+            n = len(self.backends)
+            candidates = [self.backends[(self._next + i) % n] for i in range(n)]
+            candidates = [b for b in candidates
+                          if b not in tried and b.down_until <= now and b.in_flight < self.max_in_flight]
+            if not candidates:
+                return None
+            backend = min(candidates, key=lambda b: b.in_flight)
+            self._next = (self.backends.index(backend) + 1) % n
+            backend.in_flight += 1
+            backend.requests += 1
+            backend.max_in_flight_seen = max(backend.max_in_flight_seen, backend.in_flight)
+            return backend
+
+    def _release(self, backend, seconds, failed):
+        with self._lock:
+            backend.in_flight -= 1
+            if failed:
+                backend.failures += 1
+                backend.down_until = time.time() + RETRY_AFTER
+            else:
+                backend.total_seconds += seconds
+
+    def __call__(self, user_prompt, system_prompt="", on_token=None, stats=None, allow_fallback=None):
+        allow_fallback = self.fallback if allow_fallback is None else allow_fallback
+        tried, error = [], None
+        while True:
+            backend = self._acquire(tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            start = time.perf_counter()
+            sent = []
+            # a retry on another endpoint must not repeat tokens already handed out
+            push = None if on_token is None else (lambda t: (sent.append(t), on_token(t)))
+            try:
+                text = backend.chat(self.model, user_prompt, system_prompt, push, stats)
+            except Exception as e:
+                self._release(backend, 0.0, True)
+                error = e
+                if sent:
+                    raise
+                continue
+            self._release(backend, time.perf_counter() - start, False)
+            return text
+
+        if allow_fallback:
+            summary = extractive_summary(user_prompt)
+            if summary is not None:
+                with self._lock:
+                    self.fallbacks += 1
+                if on_token is not None:
+                    on_token(summary)
+                return summary
+        if error is not None:
+            raise error
+        if all(b.down_until > time.time() for b in self.backends):
+            raise RuntimeError("no AI server reachable, please try again later")
+        raise AllBackendsBusy("all AI servers are busy, please try again shortly")
+
+    def wait_call(self, user_prompt, system_prompt="", stats=None, poll=0.2):
+        """Blocking call for batch jobs: waits for a free endpoint instead of falling back."""
+        while True:
+            try:
+                return self(user_prompt, system_prompt, stats=stats, allow_fallback=False)
+            except AllBackendsBusy:
+                time.sleep(poll)
+
+    def warm_up(self):
+        """Load the model on every endpoint now (an empty request with keep_alive)."""
+        for backend in self.backends:
+            try:
+                backend.client.generate(model=self.model, prompt="", keep_alive=KEEP_ALIVE)
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {'model': self.model, 'fallbacks': self.fallbacks,
+                    'backends': {b.host or 'default': b.stats() for b in self.backends}}
+
+# --- EXTRACTIVE FALLBACK ---
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+_WORD_RE = re.compile(r"\w{3,}")
+
+def _prompt_reviews(user_prompt):
+    """The '- ' review lines under 'Reviews:' of a prompts.py prompt."""
+    reviews, inside = [], False
+    for line in user_prompt.splitlines():
+        line = line.strip()
+        if line == "Reviews:":
+            inside = True
+        elif inside and line.startswith("- "):
+            reviews.append(line[2:])
+        elif inside and line:
+            break
+    return reviews
+
+def extractive_summary(user_prompt, n=FALLBACK_SENTENCES):
+    """
+    The n most typical review sentences (by how common their words are
+    across all reviews), or None if the prompt carries no reviews.
+    """
+    sentences = [s.strip(' "-') for r in _prompt_reviews(user_prompt) for s in _SENTENCE_RE.split(r)]
+    # whole sentences only (capped reviews end in "...")
+    sentences = list(dict.fromkeys(s for s in sentences
+                                   if len(_WORD_RE.findall(s)) >= 3 and not s.endswith("...")))
+    if not sentences:
+        return None
+    freq = Counter(w for s in sentences for w in set(_WORD_RE.findall(s.lower())))
+    def score(s):
+        words = _WORD_RE.findall(s.lower())
+        return sum(freq[w] for w in words) / len(words)
+    top = sorted(sentences, key=lambda s: (-score(s), s))[:n]
+    lines = [f"- \"{s}\"" for s in top]
+    return ExtractiveSummary("**ภาพรวม:** AI ไม่ว่างในขณะนี้ จึงแสดงประโยคเด่นจากรีวิวแทน\n" + "\n".join(lines))
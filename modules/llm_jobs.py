@@ -0,0 +1,204 @@
+#modules/llm_jobs.py
+"""
+Background job queue for LLM calls.
+
+Pages submit a prompt and get a Future back right away; a small thread pool
+runs the chat backend so the rest of the page can render while the model
+is busy. Identical prompts share one job (in flight or already finished),
+and at most MAX_CONCURRENT calls hit the model server at once.
+
+The backend is any callable backend(user_prompt, system_prompt) -> str that
+raises on failure (see llm_gateway.LLMGateway and fake_llm.FakeChat). If it
+also takes an on_token callback, tokens are handed out while the answer is
+generated: every job's future carries a TokenStream (future.stream) that
+pages can iterate, e.g. into st.write_stream.
+"""
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIG ---
+MAX_CONCURRENT = 2   # parallel requests sent to the local Ollama server
+KEEP_RESULTS = 256   # finished jobs kept for reuse (oldest dropped first)
+RETRY_AFTER = 30     # seconds before a failed prompt is sent again
+
+def job_key(user_prompt, system_prompt=""):
+    return hashlib.sha1(f"{system_prompt}\x00{user_prompt}".encode('utf-8')).hexdigest()
+
+class TokenStream:
+    """Text pieces of one job as they arrive; iterating replays them from the start."""
+    def __init__(self):
+        self._parts = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+
+    def push(self, token):
+        if not token:
+            return
+        with self._cond:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self._parts.append(token)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._parts) and not self._closed:
+                    self._cond.wait()
+                new = self._parts[i:]
+                closed = self._closed
+            i += len(new)
+            yield from new
+            if closed and not new:
+                return
+
+    def text(self):
+        with self._cond:
+            return "".join(self._parts)
+
+def _takes_on_token(backend):
+    try:
+        return 'on_token' in inspect.signature(backend).parameters
+    except (TypeError, ValueError):
+        return False
+
+class LLMJobQueue:
+    def __init__(self, backend, max_concurrent=MAX_CONCURRENT, keep_results=KEEP_RESULTS):
+        self.backend = backend
+        self._streaming = _takes_on_token(backend)
+        self.max_concurrent = max_concurrent
+        self.keep_results = keep_results
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm-job")
+        self._jobs = OrderedDict()  # key -> Future, running or finished
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.timings = {'jobs': 0, 'queue_seconds': 0.0, 'first_token_seconds': 0.0,
+                        'max_first_token_seconds': 0.0, 'total_seconds': 0.0}
+
+    def set_backend(self, backend):
+        """Swap the chat backend (e.g. a fake one); results of the old one are dropped."""
+        with self._lock:
+            self.backend = backend
+            self._streaming = _takes_on_token(backend)
+            self._jobs.clear()
+
+    def _usable(self, future):
+        """Running and good answers are reused; failures and fallback answers only for RETRY_AFTER."""
+        if not future.done():
+            return True
+        if future.exception() is None and not getattr(future.result(), 'fallback', False):
+            return True
+        return time.time() - getattr(future, 'finished_at', time.time()) < RETRY_AFTER
+
+    def submit(self, user_prompt, system_prompt="", on_done=None):
+        """
+        Future for the response; reuses the job of an identical prompt.
+        on_done(future) is attached only when a new job is started.
+        """
+        key = job_key(user_prompt, system_prompt)
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and self._usable(future):
+                self._jobs.move_to_end(key)
+                self.deduplicated += 1
+                return future
+            stream = TokenStream()
+            future = self._executor.submit(self._run, self.backend, self._streaming, stream, user_prompt, system_prompt)
+            future.stream = stream
+            future.add_done_callback(self._finished)
+            if on_done is not None:
+                future.add_done_callback(on_done)
+            # closed last, so a reader that finished the stream also sees on_done's work
+            future.add_done_callback(lambda f: stream.close())
+            self._jobs[key] = future
+            self.submitted += 1
+            self._trim()
+            return future
+
+    def _run(self, backend, streaming, stream, user_prompt, system_prompt):
+        stream.started_at = time.perf_counter()
+        try:
+            if streaming:
+                return backend(user_prompt, system_prompt, on_token=stream.push)
+            text = backend(user_prompt, system_prompt)
+            stream.push(text)
+            return text
+        finally:
+            stream.finished_at = time.perf_counter()
+            self._record_timing(stream)
+
+    def _record_timing(self, stream):
+        """Queue wait, time to first token and total generation time of a finished job."""
+        with self._lock:
+            total = stream.finished_at - stream.started_at
+            self.busy_seconds += total
+            t = self.timings
+            t['jobs'] += 1
+            t['queue_seconds'] += stream.started_at - stream.submitted_at
+            t['total_seconds'] += total
+            if stream.first_token_at is not None:
+                first = stream.first_token_at - stream.started_at
+                t['first_token_seconds'] += first
+                t['max_first_token_seconds'] = max(t['max_first_token_seconds'], first)
+
+    def _finished(self, future):
+        future.finished_at = time.time()
+        if future.exception() is not None:
+            with self._lock:
+                self.failed += 1
+
+    def _trim(self):
+        for key in list(self._jobs):
+            if len(self._jobs) <= self.keep_results:
+                break
+            if self._jobs[key].done():
+                del self._jobs[key]
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for f in self._jobs.values() if not f.done())
+            return {'submitted': self.submitted, 'deduplicated': self.deduplicated,
+                    'failed': self.failed, 'running_or_queued': running,
+                    'finished_kept': len(self._jobs) - running,
+                    'busy_seconds': round(self.busy_seconds, 2),
+                    'max_concurrent': self.max_concurrent,
+                    'avg_queue_seconds': self._avg('queue_seconds'),
+                    'avg_first_token_seconds': self._avg('first_token_seconds'),
+                    'max_first_token_seconds': round(self.timings['max_first_token_seconds'], 3),
+                    'avg_total_seconds': self._avg('total_seconds')}
+
+    def _avg(self, name):
+        jobs = self.timings['jobs']
+        return round(self.timings[name] / jobs, 3) if jobs else None
+
+def stream_text(future):
+    """Tokens of a job as they are generated; a failure ends with an error line."""
+    yield from future.stream
+    try:
+        future.result()
+    except Exception as e:
+        yield f"\n\nAI Error: {str(e)}."
+
+def format_result(future, timeout=None):
+    """Text of a finished (or, with a timeout, awaited) job; failures become an error line."""
+    try:
+        return future.result(timeout)
+    except Exception as e:
+        return f"AI Error: {str(e)}."
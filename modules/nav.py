@@ -59,4 +59,25 @@ def get_param(key, default=None, type_cast=None):
     if type_cast:
         try: return type_cast(val)
         except: return default
-    return val
\ No newline at end of file
+    return val
+
+class AIPanel:
+    """
+    Place for a streamed AI answer. Create it where the answer should appear
+    (it shows waiting_text meanwhile) and call stream() at the end of the
+    page script, so everything else is rendered before tokens are awaited.
+    """
+    def __init__(self, waiting_text="🤖 AI กำลังอ่านรีวิว..."):
+        self.box = st.container()
+        self.waiting = self.box.empty()
+        self.waiting.caption(waiting_text)
+
+    def stream(self, tokens):
+        """Write tokens (db_manager.stream_entity_summary / stream_ai_response) as they arrive."""
+        def clear_on_first(tokens):
+            for i, token in enumerate(tokens):
+                if i == 0:
+                    self.waiting.empty()
+                yield token
+        self.box.write_stream(clear_on_first(tokens))
+        self.waiting.empty()
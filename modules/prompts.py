@@ -0,0 +1,204 @@
+#modules/prompts.py
+"""
+Prompts of the AI summary panels, shared by the pages and by
+precompute_summaries.py so a summary generated offline is exactly the one a
+page would ask for.
+
+The builders return (ids of the reviews used, prompt), or None when there
+is too little review text to analyse. parse_summary turns a restaurant
+summary into its fields (overview, menu, ...) once, when it is stored. Bump TEMPLATE_VERSIONS[kind] whenever
+a prompt changes, so stored summaries of the old prompt get regenerated.
+
+Review text is not sent whole: sample_reviews picks a representative,
+deterministic subset (spread over ratings and over time, duplicates
+dropped, each review capped) that fits TOKEN_BUDGET, so long-reviewed
+entities don't fill the model's context (num_ctx 4096) and the same reviews
+always give the same prompt.
+"""
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+TEMPLATE_VERSIONS = {'restaurant': 2, 'reviewer': 2, 'compare': 1}
+TOKEN_BUDGET = 1500        # review text tokens per prompt (rest of num_ctx: template + answer)
+MAX_REVIEW_CHARS = 400     # longer reviews are cut to this
+TIME_BUCKETS = 3           # old / middle / recent reviews of each rating
+CHARS_PER_TOKEN = 4.0      # latin text; Thai script is about 2.5 chars per token
+THAI_CHARS_PER_TOKEN = 2.5
+MIN_CHARS = 10
+
+def estimate_tokens(texts: pd.Series) -> np.ndarray:
+    """Token counts of a text column, estimated from its length (no tokenizer needed)."""
+    texts = texts.astype(str)
+    thai = texts.str.count('[\u0E00-\u0E7F]').to_numpy()
+    other = texts.str.len().to_numpy() - thai
+    return np.ceil(thai / THAI_CHARS_PER_TOKEN + other / CHARS_PER_TOKEN).astype(int)
+
+def _valid_reviews(reviews: pd.DataFrame) -> pd.DataFrame:
+    """Reviews with some actual text (more than 5 characters)."""
+    if reviews.empty or 'content' not in reviews.columns:
+        return reviews.iloc[0:0]
+    return reviews[reviews['content'].astype(str).str.len() > 5]
+
+def sample_reviews(reviews: pd.DataFrame, token_budget=TOKEN_BUDGET) -> pd.DataFrame:
+    """
+    Representative reviews within token_budget, oldest first, with the
+    (capped) text in 'content'. Every rating gets one review first, then
+    ratings are drawn in proportion to how often they were given; within a
+    rating the picks rotate over old / middle / recent reviews.
+    Deterministic for the same input, whatever its row order.
+    """
+    df = _valid_reviews(reviews)
+    if df.empty:
+        return df
+    df = df.sort_values('id').copy()
+    df['content'] = df['content'].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+    df = df.loc[~df['content'].str.lower().duplicated()]  # copy-pasted reviews once
+
+    long = df['content'].str.len() > MAX_REVIEW_CHARS
+    df.loc[long, 'content'] = df.loc[long, 'content'].str.slice(0, MAX_REVIEW_CHARS).str.rstrip() + "..."
+    df['_tokens'] = estimate_tokens(df['content'])
+
+    # time bucket of each review within its rating (old / middle / recent)
+    df['_rating'] = df['rating'].fillna(0).astype(int) if 'rating' in df.columns else 0
+    df = df.sort_values(['_rating', 'timestamp', 'id'] if 'timestamp' in df.columns else ['_rating', 'id'])
+    by_rating = df.groupby('_rating', sort=False)
+    size = by_rating['id'].transform('size').to_numpy()
+    df['_bucket'] = by_rating.cumcount().to_numpy() * TIME_BUCKETS // size
+    # within a rating: one review per time bucket in turn
+    df['_pos'] = df.groupby(['_rating', '_bucket']).cumcount() * TIME_BUCKETS + df['_bucket']
+    df = df.sort_values(['_rating', '_pos', 'id'])
+    pos = df.groupby('_rating', sort=False).cumcount().to_numpy()
+    size = df.groupby('_rating', sort=False)['id'].transform('size').to_numpy()
+    # across ratings: the first review of every rating (most common rating
+    # first), then drawn in proportion to how common each rating is
+    df['_key'] = np.where(pos == 0, -size / len(df), (pos + 0.5) / size)
+    df = df.sort_values(['_key', '_rating', 'id'])
+
+    # greedy fill: skip a review that doesn't fit, a shorter one later might
+    tokens = df['_tokens'].to_numpy()
+    keep = np.zeros(len(df), dtype=bool)
+    used = 0
+    for i, t in enumerate(tokens):
+        if used + t <= token_budget:
+            keep[i] = True
+            used += t
+    picked = df.loc[keep]
+    if 'timestamp' in picked.columns:
+        picked = picked.sort_values(['timestamp', 'id'], kind='stable')
+    return picked.drop(columns=['_tokens', '_rating', '_bucket', '_pos', '_key'])
+
+def _review_text(sampled):
+    """One review per line."""
+    return "\n".join("- " + sampled['content'])
+
+def restaurant_summary_prompt(reviews: pd.DataFrame):
+    sampled = sample_reviews(reviews)
+    text_data = _review_text(sampled)
+    if len(text_data) < MIN_CHARS:
+        return None
+
+    user_prompt = f"""
+    Analyze the following restaurant reviews and summarize in Thai language only.
+    Keep it concise. Use the exact format below.
+    Do it without intro and footnote.
+    Question back is not allow either.
+
+    Reviews:
+    {text_data}
+
+    Format:
+    **ภาพรวม:** [Summary in 1 sentence, Thai language]
+    - **🍛 เมนูแนะนำ:** [List specific food names found in text in Thai language]
+    - **⏰ ช่วงเวลาที่ควรไป:** [Time/Meal in Thai language]
+    - **🌅 บรรยากาศ:** [Atmosphere in Thai language]
+    - **👨‍👩‍👧‍👦 เหมาะสำหรับ:** [Customer type in Thai language]
+    """
+    return tuple(sampled['id']), user_prompt
+
+def reviewer_summary_prompt(reviewer_name, reviews: pd.DataFrame):
+    sampled = sample_reviews(reviews)
+    text_data = _review_text(sampled)
+    if len(text_data) < MIN_CHARS:
+        return None
+    # all of the reviewer's ratings, as counts per star (not only the sampled reviews)
+    ratings = _valid_reviews(reviews)['rating'].astype(int).value_counts().sort_index()
+    rating_data = ", ".join(f"{star}★ x{n}" for star, n in ratings.items())
+
+    # --- OPTIMIZED PROMPT FOR SMALL MODEL (1B/2B) ---
+    # Strategy: Direct instruction + Data + Output Template
+    user_prompt = f"""
+    Analyze the following restaurant reviews of reviewer: {reviewer_name}
+    and summarize about the reviewer in Thai language only.
+    Keep it concise. Use the exact format below.
+    Do it without intro and footnote.
+    Question back is not allow.
+
+    Reviews:
+    {text_data}
+
+    Rating:
+    "{rating_data}"
+
+    Format:
+    จากการวิเคราะห์ประวัติการรีวิวของ **{reviewer_name}**:
+    - **🍛 แนวอาหารที่ชอบ:** [A kind of food reviewer interest, if the pattern don't clear, show as N/A.
+    Don't show that information unless they're >= 85% confident about it.
+    Don't conclude the reviewer like Thai food unless they're at least 1 word of "Thai" appear in Reviews.
+    ]
+    - **⭐ สไตล์การให้คะแนน:** [Reviewer rating bahavior in Thai language]
+    - **📍 [Other interesting fact(s)]
+
+    """
+    return tuple(sampled['id']), user_prompt
+
+# --- STRUCTURED FIELDS ---
+# field -> label of its line in the restaurant summary format above
+RESTAURANT_FIELDS = {
+    'overview': "ภาพรวม:",
+    'menu': "เมนูแนะนำ:",
+    'time': "ช่วงเวลาที่ควรไป:",
+    'ambience': "บรรยากาศ:",
+    'audience': "เหมาะสำหรับ:",
+}
+
+def parse_restaurant_summary(text):
+    """Fields of a restaurant summary; '-' for the ones the model left out."""
+    data = {field: "-" for field in RESTAURANT_FIELDS}
+    for line in (text or "").splitlines():
+        for field, label in RESTAURANT_FIELDS.items():
+            if label in line and data[field] == "-":
+                data[field] = line.split(":", 1)[1].strip(" *")
+                break
+    return data
+
+def parse_summary(kind, text):
+    """Structured fields of a summary, or None for kinds without them."""
+    if kind == 'restaurant':
+        return parse_restaurant_summary(text)
+    return None
+
+def compare_verdict_prompt(restaurant_a, fields_a, restaurant_b, fields_b):
+    """
+    Verdict prompt for two restaurants (detail dicts + parsed summaries).
+    Built in restaurant-id order and naming the restaurants, so the answer
+    fits either order on the page and is stored once per pair.
+    """
+    pair = sorted([(restaurant_a, fields_a), (restaurant_b, fields_b)], key=lambda p: int(p[0]['id']))
+    (r1, f1), (r2, f2) = pair
+
+    def describe(r, f):
+        return f"{r['name']}: {r['average_rating']:.2f} Stars. " + " ".join(
+            f"{label} {f.get(field, '-')}" for field, label in RESTAURANT_FIELDS.items())
+
+    return f"""
+    Compare these two restaurants based on the data below and give a recommendation in Thai.
+    
+    {describe(r1, f1)}
+    {describe(r2, f2)}
+    
+    Output Format:
+    **ความเหมือน:** ...
+    **ความต่าง:** ...
+    **คำแนะนำ:** เลือก {r1['name']} ถ้า... / เลือก {r2['name']} ถ้า...
+    """
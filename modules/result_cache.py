@@ -0,0 +1,130 @@
+#modules/result_cache.py
+"""
+Process-wide LRU cache for the db_manager read helpers.
+
+Unlike st.cache_data (per function, cleared by TTL) one cache is shared by
+every session and every cached helper, entries are keyed by
+(function, args, data version) and the total size is bounded in bytes.
+When the data version moves, entries of older versions are dropped.
+
+Cached DataFrames / dicts are copied on the way out, so a page can modify
+what it gets back without touching the cached value.
+"""
+import copy
+import functools
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# --- CONFIG ---
+MAX_BYTES = 64 * 1024 * 1024
+
+def _size_of(value):
+    """Rough in-memory size of a cached result, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_size_of(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_size_of(k) + _size_of(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
+
+class ResultCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def _set_version(self, version):
+        # Versions only grow: once a newer one is seen, older entries can never hit again.
+        # A caller still holding an older version just misses.
+        if self.version is None or version > self.version:
+            for key in [k for k in self._entries if k[-1] != version]:
+                self._drop(key)
+            self.version = version
+
+    def get(self, key, version):
+        """(True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            self._set_version(version)
+            entry = self._entries.get(key + (version,))
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key + (version,))
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, version, value):
+        size = _size_of(value)
+        with self._lock:
+            self._set_version(version)
+            if version != self.version or size > self.max_bytes:
+                return
+            full_key = key + (version,)
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'entries': len(self._entries),
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes, 'version': self.version}
+
+def cached(cache, get_version):
+    """
+    Decorator: memoize fn(*args) in `cache` for the data version returned by
+    get_version(). Calls with unhashable arguments bypass the cache.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            version = get_version()
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return fn(*args, **kwargs)
+            hit, value = cache.get(key, version)
+            if not hit:
+                value = fn(*args, **kwargs)
+                cache.put(key, version, value)
+            return _copy(value)
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
@@ -0,0 +1,180 @@
+#modules/search.py
+"""
+In-process full-text search (BM25) over restaurant names, keywords and
+review text.
+
+Tokenizing: latin words / numbers are lowercased whole words; Thai has no
+spaces between words, so each run of Thai characters is indexed as
+overlapping character bigrams (a single Thai character stays a unigram).
+The last word of a query is also matched as a prefix ("biry" -> biryani).
+
+The index follows the data version: appended reviews are added
+incrementally, anything else (edited rows, new restaurants) rebuilds it.
+"""
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+import pandas as pd
+from modules import db_manager
+
+# --- CONFIG ---
+K1 = 1.2
+B = 0.75
+# Restaurant score = sum of field BM25 scores times these boosts
+FIELD_BOOSTS = {'name': 3.0, 'keywords': 2.0, 'reviews': 1.0}
+MAX_PREFIX_TERMS = 50
+
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u0E00-\u0E7F]+")
+_THAI_RE = re.compile(r"[\u0E00-\u0E7F]")
+
+def tokenize(text):
+    tokens = []
+    for word in _WORD_RE.findall(str(text).lower()):
+        if _THAI_RE.match(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+class InvertedIndex:
+    """Term -> {doc_id: term frequency}, with BM25 scoring."""
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_len = {}
+        self.total_len = 0
+        self._terms = None  # sorted vocabulary, rebuilt lazily for prefix lookups
+
+    def add(self, doc_id, tokens):
+        """Index tokens for doc_id; adding to an existing doc extends it."""
+        for t in tokens:
+            posting = self.postings[t]
+            posting[doc_id] = posting.get(doc_id, 0) + 1
+        self.doc_len[doc_id] = self.doc_len.get(doc_id, 0) + len(tokens)
+        self.total_len += len(tokens)
+        self._terms = None
+
+    def expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self.postings else []
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        i = bisect.bisect_left(self._terms, term)
+        out = []
+        while i < len(self._terms) and self._terms[i].startswith(term) and len(out) < MAX_PREFIX_TERMS:
+            out.append(self._terms[i])
+            i += 1
+        return out
+
+    def score(self, query_tokens, prefix_last=True):
+        """{doc_id: BM25 score} for the query; the last token is matched as a prefix."""
+        n = len(self.doc_len)
+        if not n or not query_tokens:
+            return {}
+        avg_len = self.total_len / n
+        scores = defaultdict(float)
+        for qi, qt in enumerate(query_tokens):
+            # every prefix expansion of a token counts once, with its best match per doc
+            best = {}
+            for term in self.expand(qt, prefix_last and qi == len(query_tokens) - 1):
+                posting = self.postings[term]
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self.doc_len[doc_id] / avg_len))
+                    s = idf * norm
+                    if s > best.get(doc_id, 0.0):
+                        best[doc_id] = s
+            for doc_id, s in best.items():
+                scores[doc_id] += s
+        return scores
+
+class SearchIndex:
+    def __init__(self):
+        self.fields = {name: InvertedIndex() for name in FIELD_BOOSTS}
+        self.reviews = InvertedIndex()
+        self.last_review_id = 0
+        self.review_count = 0
+
+    def add_restaurants(self, restaurants):
+        for row in restaurants.itertuples(index=False):
+            rid = int(row.id)
+            self.fields['name'].add(rid, tokenize(row.name))
+            self.fields['keywords'].add(rid, tokenize(getattr(row, 'keywords', '')))
+
+    def add_reviews(self, reviews):
+        for rev_id, res_id, content in zip(reviews['id'], reviews['restaurant_id'], reviews['content']):
+            tokens = tokenize(content if isinstance(content, str) else "")
+            self.reviews.add(int(rev_id), tokens)
+            if not pd.isna(res_id):
+                self.fields['reviews'].add(int(res_id), tokens)
+        if len(reviews):
+            self.last_review_id = max(self.last_review_id, int(reviews['id'].max()))
+        self.review_count += len(reviews)
+
+    def search_restaurants(self, query, limit=None):
+        """[(restaurant_id, score)] best first."""
+        tokens = tokenize(query)
+        total = defaultdict(float)
+        for name, boost in FIELD_BOOSTS.items():
+            for doc_id, s in self.fields[name].score(tokens).items():
+                total[doc_id] += boost * s
+        ranked = sorted(total.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:limit] if limit else ranked
+
+    def search_reviews(self, query, limit=20):
+        """[(review_id, score)] best first."""
+        ranked = sorted(self.reviews.score(tokenize(query)).items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:limit] if limit else ranked
+
+_index = None
+_index_state = {}
+# Also held while searching: an incremental patch must not run under a reader
+_lock = threading.RLock()
+
+def _restaurants_fingerprint(con):
+    return con.execute("SELECT COUNT(*), bit_xor(hash(id, name, keywords)) FROM restaurants").fetchone()
+
+def _reviews_fingerprint(con, up_to_id):
+    return con.execute("SELECT COUNT(*), bit_xor(hash(id, restaurant_id, content)) FROM reviews WHERE id <= ?", [up_to_id]).fetchone()
+
+def get_index() -> SearchIndex:
+    """Search index for the current data version (built or patched on demand)."""
+    global _index, _index_state
+    version = db_manager.get_data_version()
+    if _index is not None and _index_state.get('version') == version:
+        return _index
+    with _lock:
+        if _index is not None and _index_state.get('version') == version:
+            return _index
+        con = db_manager.get_db()
+        res_fp = _restaurants_fingerprint(con)
+        index = _index
+        # Append-only change: the rows already indexed are untouched, so only the new ones are added
+        if (index is not None and _index_state.get('restaurants') == res_fp
+                and _reviews_fingerprint(con, index.last_review_id) == _index_state.get('reviews')):
+            index.add_reviews(con.execute("SELECT id, restaurant_id, content FROM reviews WHERE id > ? ORDER BY id",
+                                          [index.last_review_id]).df())
+        else:
+            index = SearchIndex()
+            index.add_restaurants(con.execute("SELECT id, name, keywords FROM restaurants").df())
+            index.add_reviews(con.execute("SELECT id, restaurant_id, content FROM reviews ORDER BY id").df())
+        _index = index
+        _index_state = {'version': version, 'restaurants': res_fp,
+                        'reviews': _reviews_fingerprint(con, index.last_review_id)}
+        return index
+
+def search_restaurants(query, limit=None) -> pd.DataFrame:
+    """Ranked restaurant hits: columns id, score."""
+    with _lock:
+        hits = get_index().search_restaurants(query, limit)
+    return pd.DataFrame(hits, columns=['id', 'score'])
+
+def search_reviews(query, limit=20) -> pd.DataFrame:
+    """Ranked review hits: columns id, score."""
+    with _lock:
+        hits = get_index().search_reviews(query, limit)
+    return pd.DataFrame(hits, columns=['id', 'score'])
@@ -0,0 +1,116 @@
+#modules/sheet_pool.py
+"""
+Long-lived Google Sheets client shared by the whole process.
+
+Authorizes once (again only when the token is about to expire), keeps the
+Spreadsheet / Worksheet handles, caches id -> sheet row maps so writes
+don't need ws.find() column scans, and counts every API call so quota use
+can be watched via SheetPool.stats().
+"""
+import threading
+import time
+from collections import Counter
+
+# --- CONFIG ---
+# oauth2client tokens live for an hour; re-authorize a bit before that
+TOKEN_LIFETIME = 3000
+
+class _Counted:
+    """Proxy that records each method call on the wrapped gspread object."""
+    def __init__(self, target, pool, prefix):
+        self._target = target
+        self._pool = pool
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        def call(*args, **kwargs):
+            self._pool.record(f"{self._prefix}.{name}")
+            return attr(*args, **kwargs)
+        return call
+
+class _CountedSpreadsheet(_Counted):
+    def worksheet(self, title):
+        return self._pool.worksheet(title)
+
+class SheetPool:
+    def __init__(self, authorize, sheet_name, token_lifetime=TOKEN_LIFETIME):
+        """authorize() -> (client, credentials); credentials may be None (e.g. a fake client)."""
+        self.authorize = authorize
+        self.sheet_name = sheet_name
+        self.token_lifetime = token_lifetime
+        self.api_calls = Counter()
+        self._lock = threading.RLock()
+        self._client = None
+        self._creds = None
+        self._authorized_at = 0.0
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._row_maps = {}
+
+    def record(self, name):
+        with self._lock:
+            self.api_calls[name] += 1
+
+    def stats(self):
+        with self._lock:
+            calls = dict(self.api_calls)
+        return {'total': sum(calls.values()), 'calls': calls}
+
+    def reset(self):
+        """Drop the client and every cached handle (e.g. after an auth error)."""
+        with self._lock:
+            self._client = None
+            self._creds = None
+            self._spreadsheet = None
+            self._worksheets = {}
+            self._row_maps = {}
+
+    def _token_expired(self):
+        if self._creds is None:
+            return False
+        if getattr(self._creds, 'access_token_expired', False):
+            return True
+        return time.time() - self._authorized_at > self.token_lifetime
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._client is None or self._token_expired():
+                self.reset()
+                self._client, self._creds = self.authorize()
+                self._authorized_at = time.time()
+                self.record('authorize')
+            if self._spreadsheet is None:
+                self.record('client.open')
+                self._spreadsheet = _CountedSpreadsheet(self._client.open(self.sheet_name), self, 'spreadsheet')
+            return self._spreadsheet
+
+    def worksheet(self, title):
+        with self._lock:
+            if title not in self._worksheets:
+                sh = self.spreadsheet()
+                self.record('spreadsheet.worksheet')
+                self._worksheets[title] = _Counted(sh._target.worksheet(title), self, title)
+            return self._worksheets[title]
+
+    def row_index(self, title, refresh=False):
+        """{id in column A (as str): sheet row}, read once and then served from memory."""
+        with self._lock:
+            if refresh or title not in self._row_maps:
+                values = self.worksheet(title).col_values(1)
+                self._row_maps[title] = {str(v): i + 1 for i, v in enumerate(values) if i > 0}
+            return self._row_maps[title]
+
+    def row_of(self, title, key):
+        """Sheet row holding `key`, re-reading the id column once if it's not known yet."""
+        row = self.row_index(title).get(str(key))
+        if row is None:
+            row = self.row_index(title, refresh=True).get(str(key))
+        return row
+
+    def forget_rows(self, title):
+        """Call when rows of a sheet were added, removed or reordered."""
+        with self._lock:
+            self._row_maps.pop(title, None)
@@ -0,0 +1,105 @@
+#modules/sheet_sync.py
+"""
+Incremental sync from Google Sheets into the local tables.
+
+Instead of re-downloading every worksheet, each sheet is compared against
+the state recorded at the last sync (header + row count):
+  - the id column (A) is read to find appended / removed rows
+  - only the appended rows are fetched in full
+  - columns that change in place (formulas, follower counts) are re-read
+    on their own and only the rows whose values moved are patched
+Anything unexpected (rows deleted or reordered, header changed) falls
+back to a full download of that one sheet.
+"""
+import pandas as pd
+from gspread.utils import numericise_all, rowcol_to_a1
+
+# key: id column, mutable: columns that change without a new row being added.
+# None means the sheet is small enough to always re-read whole.
+# Columns not listed as mutable are assumed never to change once a row is
+# written: 'reviews' is append-only, so editing an existing review's text or
+# rating on the sheet doesn't reach the snapshot. Such edits need a full
+# download (remove data/snapshot and restart, or re-seed).
+SYNC_PLAN = {
+    'restaurants': {'key': 'id', 'mutable': ['average_rating', 'review_count']},
+    'reviews': {'key': 'id', 'mutable': []},
+    'reviewers': {'key': 'reviewer_id', 'mutable': ['total_reviews', 'followers']},
+    'users': None,
+}
+
+# Columns the Sheets API must hand back as text (1-based), see load_data
+NUMERICISE_IGNORE = {'users': [5]}
+
+class SheetDelta:
+    """Changes for one sheet: rows to append, rows to update by key, or a full replacement."""
+    def __init__(self, name, key=None, append=None, update=None, replace=None):
+        self.name = name
+        self.key = key
+        self.append = append
+        self.update = update
+        self.replace = replace
+
+    def is_empty(self):
+        return all(df is None or df.empty for df in [self.append, self.update]) and self.replace is None
+
+def sheet_state(data):
+    """State recorded in the snapshot manifest after a sync."""
+    return {name: {'header': list(df.columns), 'rows': len(df)} for name, df in data.items() if len(df.columns)}
+
+def _to_frame(name, header, rows):
+    ignore = NUMERICISE_IGNORE.get(name, [])
+    width = len(header)
+    rows = [numericise_all((list(r) + [''] * width)[:width], ignore=ignore) for r in rows]
+    return pd.DataFrame(rows, columns=header)
+
+def _full(ws, name):
+    ignore = NUMERICISE_IGNORE.get(name)
+    records = ws.get_all_records(numericise_ignore=ignore) if ignore else ws.get_all_records()
+    return SheetDelta(name, replace=pd.DataFrame(records))
+
+def diff_sheet(ws, name, local_df, state):
+    """Work out the SheetDelta for one worksheet against the local table."""
+    plan = SYNC_PLAN.get(name)
+    if plan is None or not state or local_df is None or list(local_df.columns) != state['header']:
+        return _full(ws, name)
+
+    header = state['header']
+    key = plan['key']
+    known = len(local_df)
+    remote_ids = ws.col_values(header.index(key) + 1)[1:]
+    local_ids = local_df[key].astype(str).tolist()
+
+    # Deleted or reordered rows: positions no longer line up
+    if len(remote_ids) < known or [str(x) for x in remote_ids[:known]] != local_ids:
+        return _full(ws, name)
+
+    delta = SheetDelta(name, key=key)
+    if len(remote_ids) > known:
+        first = rowcol_to_a1(known + 2, 1)
+        last = rowcol_to_a1(len(remote_ids) + 1, len(header))
+        delta.append = _to_frame(name, header, ws.get(f"{first}:{last}"))
+
+    if plan['mutable'] and known:
+        cols = [header.index(c) + 1 for c in plan['mutable']]
+        first = rowcol_to_a1(2, min(cols))
+        last = rowcol_to_a1(known + 1, max(cols))
+        span = header[min(cols) - 1:max(cols)]
+        remote = _to_frame(name, span, ws.get(f"{first}:{last}"))[plan['mutable']]
+        remote[key] = local_df[key].values
+        local = local_df[[key] + plan['mutable']]
+        changed = pd.Series(False, index=local.index)
+        for c in plan['mutable']:
+            changed |= pd.to_numeric(remote[c], errors='coerce').fillna(0).values != pd.to_numeric(local[c], errors='coerce').fillna(0).values
+        delta.update = remote[changed.values][[key] + plan['mutable']]
+    return delta
+
+def diff_spreadsheet(sh, data, manifest):
+    """SheetDelta for every worksheet; `data` is the current local tables."""
+    state = (manifest or {}).get('sheets', {})
+    deltas = []
+    for name in SYNC_PLAN:
+        try:
+            deltas.append(diff_sheet(sh.worksheet(name), name, data.get(name), state.get(name)))
+        except Exception:
+            continue
+    return [d for d in deltas if not d.is_empty()]
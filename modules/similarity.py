@@ -1,38 +1,67 @@
 # modules/similarity.py
-import streamlit as st
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, TfidfTransformer
+from sklearn.preprocessing import normalize
 from typing import Tuple, List
-from modules import db_manager
+from modules import db_manager, snapshot
+
+# --- CONFIG ---
+TOP_K = 20          # neighbours kept per entity
+BATCH_SIZE = 512    # rows per sparse matmul block when ranking neighbours
+# Each part of a restaurant vector is L2-normalized and then weighted, so the
+# raw rating counts (up to ~100 per restaurant) don't drown out the rest
+RESTAURANT_WEIGHTS = {'ratings': 1.0, 'co_reviewers': 1.0, 'keywords': 1.0}
 
-@st.cache_data
 def _load_reviews_table() -> pd.DataFrame:
     con = db_manager.get_db()
-    df = con.execute("SELECT * FROM reviews").df()
+    # only the integer columns; review text and names are not needed here
+    df = con.execute("SELECT id, restaurant_id, reviewer_id, rating FROM reviews").df()
     # normalize rating to numeric
     if 'rating' in df.columns:
         df['rating'] = pd.to_numeric(df['rating'], errors='coerce').astype('Int64')
     return df
 
-@st.cache_data
 def _load_restaurants_table() -> pd.DataFrame:
     con = db_manager.get_db()
     df = con.execute("SELECT * FROM restaurants").df()
     return df
 
-@st.cache_data
 def _load_reviewers_table() -> pd.DataFrame:
     con = db_manager.get_db()
     df = con.execute("SELECT * FROM reviewers").df()
     return df
 
-@st.cache_data
-def build_restaurant_vectors() -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
+def _tfidf(docs, vect=None) -> sp.csr_matrix:
+    vect = vect or TfidfVectorizer(token_pattern=r"(?u)\S+")
+    if len(docs) == 0 or all([d == "" for d in docs]):
+        return sp.csr_matrix((len(docs), 1))
+    return vect.fit_transform(docs).tocsr()
+
+def _id_tfidf(row_ids, rows, token_ids) -> sp.csr_matrix:
     """
-    Build vectors for restaurants: concat [rating_counts_5..1] + tfidf(reviewer_ids)
-    Returns: restaurants_df (index by restaurant_id), vectors (n x d), restaurant_ids list
+    TF-IDF over integer tokens: one row per entry of row_ids, token_ids[i]
+    counted once for rows[i] (positions into row_ids, -1 = not listed).
+    Builds the count matrix directly, no string docs.
+    """
+    keep = rows >= 0
+    rows, token_ids = rows[keep], token_ids[keep]
+    if len(token_ids) == 0:
+        return sp.csr_matrix((len(row_ids), 1))
+    vocab, cols = np.unique(token_ids, return_inverse=True)
+    counts = sp.coo_matrix((np.ones(len(cols), dtype=np.int64), (rows, cols)), shape=(len(row_ids), len(vocab))).tocsr()
+    return TfidfTransformer().fit_transform(counts).tocsr()
+
+def _split_keywords(text):
+    return [kw.strip().lower() for kw in str(text).split(',') if kw.strip() and kw.strip().lower() != 'nan']
+
+def build_restaurant_vectors() -> Tuple[pd.DataFrame, sp.csr_matrix, List[int]]:
+    """
+    Build vectors for restaurants: concat [rating_counts_5..1] + tfidf(reviewer ids) + tfidf(keywords),
+    each block L2-normalized and scaled by RESTAURANT_WEIGHTS
+    Returns: restaurants_df (index by restaurant_id), sparse vectors (n x d), restaurant_ids list
     """
     reviews = _load_reviews_table()
     restaurants = _load_restaurants_table()
@@ -51,32 +80,34 @@ def build_restaurant_vectors() -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
     # order as [5,4,3,2,1]
     rating_vec = rating_counts[[5,4,3,2,1]].reindex(restaurants[rest_id_col].values, fill_value=0).fillna(0).astype(int).to_numpy()
 
-    # Build reviewer-list-as-string per restaurant for TF-IDF tokenization
-    # convert reviewer_id to string tokens
-    rev_tokens = reviews.groupby('restaurant_id')['reviewer_name'].apply(lambda s: " ".join([str(x).replace(" ", "_") for x in s.tolist()]))
-    # align to restaurant order
-    docs = []
-    for rid in restaurants[rest_id_col].values:
-        docs.append(rev_tokens.get(rid, ""))
+    # Co-reviewer block: which reviewer_ids reviewed the restaurant
+    res_ids = restaurants[rest_id_col].to_numpy()
+    rows = pd.Index(res_ids).get_indexer(reviews['restaurant_id'])
+    reviewer_ids = reviews['reviewer_id'].fillna(0).to_numpy(dtype=np.int64)
+    rows[reviewer_ids <= 0] = -1  # reviewer unknown (id missing in the sheet)
+    co_reviewers = _id_tfidf(res_ids, rows, reviewer_ids)
 
-    # TF-IDF on reviewer tokens
-    vect = TfidfVectorizer(token_pattern=r"(?u)\S+")
-    if len(docs) == 0 or all([d == "" for d in docs]):
-        tfidf_mat = np.zeros((len(docs),1))
-    else:
-        tfidf_mat = vect.fit_transform(docs).toarray()
+    # Keywords are comma separated phrases ("Biryani, Chicken Tikka")
+    kw_docs = restaurants['keywords'].fillna("").astype(str).tolist() if 'keywords' in restaurants.columns else [""] * len(res_ids)
+    kw_vect = TfidfVectorizer(tokenizer=_split_keywords, token_pattern=None, lowercase=False)
+    if all(not _split_keywords(d) for d in kw_docs):
+        kw_docs = [""] * len(kw_docs)
 
-    # Concatenate rating_vec and tfidf_mat
-    vectors = np.hstack([rating_vec, tfidf_mat]) if tfidf_mat.size else rating_vec
+    # TF-IDF blocks kept sparse (~100 x 7000 and mostly zeros)
+    blocks = [
+        RESTAURANT_WEIGHTS['ratings'] * normalize(sp.csr_matrix(rating_vec, dtype=np.float64)),
+        RESTAURANT_WEIGHTS['co_reviewers'] * co_reviewers,
+        RESTAURANT_WEIGHTS['keywords'] * _tfidf(kw_docs, kw_vect),
+    ]
+    vectors = sp.hstack(blocks, format='csr')
 
     # return restaurants df keyed and ids list
     return restaurants.set_index(rest_id_col), vectors, restaurants[rest_id_col].astype(int).tolist()
 
-@st.cache_data
-def build_reviewer_vectors() -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
+def build_reviewer_vectors() -> Tuple[pd.DataFrame, sp.csr_matrix, List[int]]:
     """
     Build reviewer vectors: rating distribution (5..1) + TF-IDF of restaurants they reviewed
-    Returns: reviewers_df (index by reviewer_id), vectors, reviewer_ids
+    Returns: reviewers_df (index by reviewer_id), sparse vectors, reviewer_ids
     """
     reviews = _load_reviews_table()
     reviewers = _load_reviewers_table()
@@ -85,58 +116,182 @@ def build_reviewer_vectors() -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
     reviewers = reviewers.copy()
     reviewers['__rid'] = reviewers[rev_id_col].astype(str)
 
-    # rating counts per reviewer
-    rating_counts = reviews.groupby(['reviewer_name','rating']).size().unstack(fill_value=0)
-    # find mapping from reviewer_name to id
-    # We'll use reviewer_name from reviewers table (assume name column exists)
-    # Build docs: for each reviewer, list restaurant ids or names as tokens
-    # Build list of unique reviewer names in same order as reviewers table
-    reviewer_names = reviewers['name'].astype(str).tolist()
-    docs = []
-    rating_vecs = []
-    for name in reviewer_names:
-        sub = reviews[reviews['reviewer_name'] == name]
-        # rating counts 5..1
-        counts = []
-        for r in [5,4,3,2,1]:
-            counts.append(int(sub[sub['rating'] == r].shape[0]))
-        rating_vecs.append(counts)
-        docs.append(" ".join([str(x).replace(" ", "_") for x in sub['restaurant_id'].astype(str).tolist()]))
-
-    rating_vec_array = np.array(rating_vecs)
-
-    vect = TfidfVectorizer(token_pattern=r"(?u)\S+")
-    if len(docs) == 0 or all([d == "" for d in docs]):
-        tfidf_mat = np.zeros((len(docs),1))
-    else:
-        tfidf_mat = vect.fit_transform(docs).toarray()
+    # Position of each review's reviewer in the reviewers table (integer join)
+    n = len(reviewers)
+    pos_all = pd.Index(reviewers[rev_id_col].to_numpy()).get_indexer(reviews['reviewer_id'])
+    matched = reviews[pos_all >= 0]
+    pos = pos_all[pos_all >= 0]
 
-    vectors = np.hstack([rating_vec_array, tfidf_mat]) if tfidf_mat.size else rating_vec_array
+    # rating counts 5..1
+    ratings = matched['rating']
+    valid = ratings.isin([1, 2, 3, 4, 5]).to_numpy(dtype=bool)
+    rating_vec_array = np.zeros((n, 5), dtype=int)
+    np.add.at(rating_vec_array, (pos[valid], 5 - ratings[valid].astype(int).to_numpy()), 1)
+
+    # Restaurant-token counts built directly as a sparse matrix
+    tfidf_mat = _id_tfidf(np.arange(n), pos, matched['restaurant_id'].to_numpy())
+
+    vectors = sp.hstack([sp.csr_matrix(rating_vec_array), tfidf_mat], format='csr')
 
     return reviewers.set_index(rev_id_col), vectors, reviewers[rev_id_col].astype(int).tolist()
 
+# --- NEIGHBOUR TABLES ---
+def top_k_neighbors(vectors, k=TOP_K, batch_size=BATCH_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine top-k for every row: L2-normalize once, then rank one block of
+    rows at a time with a sparse matmul against the whole matrix.
+    Returns (positions, scores), both n x k; the row itself is excluded and
+    ties are broken by position so the result is deterministic.
+    """
+    X = normalize(sp.csr_matrix(vectors, dtype=np.float64), norm='l2', axis=1)
+    n = X.shape[0]
+    k = max(0, min(k, n - 1))
+    positions = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return positions, scores
+
+    XT = X.T.tocsc()
+    for start in range(0, n, batch_size):
+        end = min(start + batch_size, n)
+        sims = (X[start:end] @ XT).toarray()
+        rows = np.arange(end - start)
+        sims[rows, np.arange(start, end)] = -np.inf
+        cand = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        cand_scores = np.take_along_axis(sims, cand, axis=1)
+        order = np.lexsort((cand, -cand_scores), axis=1)
+        positions[start:end] = np.take_along_axis(cand, order, axis=1)
+        scores[start:end] = np.take_along_axis(cand_scores, order, axis=1)
+    return positions, scores
+
+class NeighborIndex:
+    """Precomputed top-k neighbours, looked up by entity id in O(k)."""
+    def __init__(self, ids, neighbor_ids, scores):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.neighbor_ids = np.asarray(neighbor_ids, dtype=np.int64).reshape(len(self.ids), -1)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(len(self.ids), -1)
+        self._pos = {int(i): p for p, i in enumerate(self.ids)}
+
+    @classmethod
+    def from_vectors(cls, ids, vectors, k=TOP_K):
+        positions, scores = top_k_neighbors(vectors, k=k)
+        ids = np.asarray(ids, dtype=np.int64)
+        return cls(ids, ids[positions], scores)
+
+    def lookup(self, entity_id, top_n=TOP_K):
+        """(neighbor_ids, scores) best first, or None for an unknown id. At most the k stored neighbours."""
+        p = self._pos.get(int(entity_id))
+        if p is None:
+            return None
+        return self.neighbor_ids[p, :top_n], self.scores[p, :top_n]
+
+    def to_frame(self) -> pd.DataFrame:
+        k = self.neighbor_ids.shape[1]
+        return pd.DataFrame({
+            'entity_id': np.repeat(self.ids, k),
+            'rank': np.tile(np.arange(k), len(self.ids)),
+            'neighbor_id': self.neighbor_ids.ravel(),
+            'similarity': self.scores.ravel(),
+        })
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.sort_values(['entity_id', 'rank'])
+        ids = df['entity_id'].drop_duplicates().to_numpy()
+        return cls(ids, df['neighbor_id'].to_numpy(), df['similarity'].to_numpy())
+
+def scan_neighbors(ids, vectors, entity_id, top_n):
+    """
+    Cosine top-n of one entity against every row, ranked like
+    top_k_neighbors; for top_n beyond the stored neighbours.
+    Returns (neighbor_ids, scores), or None for an unknown id.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    p = np.flatnonzero(ids == int(entity_id))
+    if len(p) == 0:
+        return None
+    X = normalize(sp.csr_matrix(vectors, dtype=np.float64), norm='l2', axis=1)
+    sims = (X @ X[p[0]].T).toarray().ravel()
+    sims[p[0]] = -np.inf
+    order = np.lexsort((np.arange(len(ids)), -sims))[:max(0, min(top_n, len(ids) - 1))]
+    return ids[order], sims[order].astype(np.float32)
+
+def reviews_fingerprint() -> str:
+    """Changes whenever a review or a restaurant's keywords change, or the entity lists change."""
+    con = db_manager.get_db()
+    n, h = con.execute("SELECT COUNT(*), bit_xor(hash(id, restaurant_id, reviewer_id, rating)) FROM reviews").fetchone()
+    n_res, h_res = con.execute("SELECT COUNT(*), bit_xor(hash(id, keywords)) FROM restaurants").fetchone()
+    n_rev = con.execute("SELECT COUNT(*) FROM reviewers").fetchone()[0]
+    return f"{n}-{h or 0}-{n_res}-{h_res or 0}-{n_rev}"
+
+_BUILDERS = {'restaurants': build_restaurant_vectors, 'reviewers': build_reviewer_vectors}
+
+def _neighbor_cache(kind):
+    def build():
+        _, vectors, ids = _BUILDERS[kind]()
+        return NeighborIndex.from_vectors(ids, vectors)
+    return snapshot.ArtifactCache(f"neighbors_{kind}", db_manager.get_data_version, reviews_fingerprint, build,
+                                  to_frame=NeighborIndex.to_frame, from_frame=NeighborIndex.from_frame)
+
+_indexes = {kind: _neighbor_cache(kind) for kind in _BUILDERS}
+# looked-up neighbours with their metadata, per data version (metadata like
+# followers can change without the neighbours changing); shared by the
+# request threads
+_results = {}
+_results_lock = threading.Lock()
+
+def get_neighbor_index(kind: str) -> NeighborIndex:
+    """
+    Neighbour index for 'restaurants' or 'reviewers'. Checked against the
+    data version on every call, but only rebuilt (or re-read from the
+    snapshot artifacts) when the reviews fingerprint changes.
+    """
+    return _indexes[kind].get()
+
+def _with_metadata(hits, table, key) -> pd.DataFrame:
+    ids, scores = hits
+    df = pd.DataFrame({key: ids.astype(int), 'similarity': scores.astype(float)})
+    if df.empty:
+        return df
+    meta = db_manager.get_db().execute(f"SELECT * FROM {table} WHERE {'id' if table == 'restaurants' else key} IN (SELECT unnest(?))",
+                                       [df[key].tolist()]).df()
+    if table == 'restaurants':
+        meta = meta.rename(columns={'id': key})
+    return df.merge(meta, on=key, how='left')
+
+def _similar(kind, table, key, entity_id, top_n) -> pd.DataFrame:
+    version = db_manager.get_data_version()
+    memo_key = (int(entity_id), top_n)
+    with _results_lock:
+        if _results.get(kind, (None,))[0] != version:
+            _results[kind] = (version, {})
+        results = _results[kind][1]
+        if memo_key in results:
+            return results[memo_key]
+
+    if top_n <= TOP_K:
+        hits = get_neighbor_index(kind).lookup(entity_id, top_n)
+    else:
+        # more than the index keeps: rank against every row
+        _, vectors, ids = _BUILDERS[kind]()
+        hits = scan_neighbors(ids, vectors, entity_id, top_n)
+    result = pd.DataFrame() if hits is None else _with_metadata(hits, table, key)
+    with _results_lock:
+        # a newer version may have replaced the memo meanwhile; this result then just isn't kept
+        return results.setdefault(memo_key, result)
+
 def get_similar_restaurants(restaurant_id: int, top_n: int = 5) -> pd.DataFrame:
-    restaurants_df, vectors, ids = build_restaurant_vectors()
-    if restaurant_id not in ids:
-        return pd.DataFrame()
-
-    idx = ids.index(restaurant_id)
-    sims = cosine_similarity(vectors[idx:idx+1], vectors)[0]
-    # build result excluding itself
-    df = pd.DataFrame({'restaurant_id': ids, 'similarity': sims})
-    df = df[df['restaurant_id'] != restaurant_id].sort_values('similarity', ascending=False).head(top_n)
-    # join with restaurants_df metadata
-    res = df.merge(restaurants_df.reset_index(), on='restaurant_id', how='left')
-    return res
+    """
+    Top-n restaurants by rating profile, shared reviewers and keywords (best
+    first). Up to TOP_K come from the neighbour index; a larger top_n ranks
+    against every restaurant.
+    """
+    return _similar('restaurants', 'restaurants', 'restaurant_id', restaurant_id, top_n)
 
 def get_similar_reviewers(reviewer_id: int, top_n: int = 5) -> pd.DataFrame:
-    reviewers_df, vectors, ids = build_reviewer_vectors()
-    if reviewer_id not in ids:
-        return pd.DataFrame()
-
-    idx = ids.index(reviewer_id)
-    sims = cosine_similarity(vectors[idx:idx+1], vectors)[0]
-    df = pd.DataFrame({'reviewer_id': ids, 'similarity': sims})
-    df = df[df['reviewer_id'] != reviewer_id].sort_values('similarity', ascending=False).head(top_n)
-    res = df.merge(reviewers_df.reset_index(), on='reviewer_id', how='left')
-    return res
+    """
+    Top-n reviewers by rating behaviour and restaurants visited (best
+    first). Up to TOP_K come from the neighbour index; a larger top_n ranks
+    against every reviewer.
+    """
+    return _similar('reviewers', 'reviewers', 'reviewer_id', reviewer_id, top_n)
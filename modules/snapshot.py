@@ -0,0 +1,194 @@
+#modules/snapshot.py
+import os
+import json
+import shutil
+import threading
+import time
+import duckdb
+
+# --- CONFIG ---
+SNAPSHOT_DIR = 'data/snapshot'
+MANIFEST_FILE = 'manifest.json'
+KEEP_VERSIONS = 2
+
+_save_lock = threading.Lock()
+
+# Every save goes into its own folder and manifest.json is swapped last,
+# so a reader never sees half of one snapshot and half of another.
+#
+# data/snapshot/
+#   manifest.json          {"version": "...", "revision": "...", "saved_at": ..., "tables": {...}}
+#   v<timestamp>/<table>.parquet
+
+def read_manifest(path=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_parquet(con, df, file_path):
+    """Write a DataFrame, or a DuckDB relation streamed from its own connection; returns the row count."""
+    if isinstance(df, duckdb.DuckDBPyRelation):
+        df.write_parquet(file_path)
+        return con.execute("SELECT COUNT(*) FROM read_parquet(?)", [file_path]).fetchone()[0]
+    con.register('__src', df)
+    try:
+        con.execute(f"COPY (SELECT * FROM __src) TO '{file_path}' (FORMAT PARQUET)")
+    finally:
+        con.unregister('__src')
+    return len(df)
+
+def _carry_over(previous, folder, path, skip):
+    """Link the unchanged tables of the previous snapshot into the new folder."""
+    tables = {}
+    old_folder = os.path.join(path, previous['version'])
+    for name, rows in previous.get('tables', {}).items():
+        if name in skip:
+            continue
+        src = os.path.join(old_folder, f"{name}.parquet")
+        dst = os.path.join(folder, f"{name}.parquet")
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+        tables[name] = rows
+    return tables
+
+def save_snapshot(data, revision=None, path=SNAPSHOT_DIR, extra=None, partial=False):
+    """
+    Persist the typed tables (DataFrames or DuckDB relations) as Parquet files.
+    `extra` is merged into the manifest (e.g. per-sheet sync state).
+    With partial=True only the tables in `data` are rewritten; the rest are
+    carried over from the current snapshot, and so is the revision when
+    none is given.
+    Returns the new manifest.
+    """
+    with _save_lock:
+        return _save(data, revision, path, extra, partial)
+
+def _save(data, revision, path, extra, partial):
+    version = f"v{time.time_ns()}"
+    folder = os.path.join(path, version)
+    os.makedirs(folder, exist_ok=True)
+
+    tables = {}
+    previous = read_manifest(path) if partial else None
+    if previous:
+        tables = _carry_over(previous, folder, path, skip=set(data))
+        if revision is None:
+            revision = previous.get('revision')
+        extra = {**{k: v for k, v in previous.items() if k not in ('version', 'revision', 'saved_at', 'tables')}, **(extra or {})}
+    con = duckdb.connect(database=':memory:')
+    try:
+        for name, df in data.items():
+            if df is None or len(df.columns) == 0:
+                continue
+            tables[name] = _write_parquet(con, df, os.path.join(folder, f"{name}.parquet"))
+    finally:
+        con.close()
+
+    manifest = {'version': version, 'revision': revision, 'saved_at': time.time(), 'tables': tables}
+    if extra:
+        manifest.update(extra)
+    tmp = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, MANIFEST_FILE))
+
+    _prune(path, keep=KEEP_VERSIONS)
+    return manifest
+
+def _prune(path, keep):
+    versions = sorted(d for d in os.listdir(path) if d.startswith('v') and os.path.isdir(os.path.join(path, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+def load_snapshot(path=SNAPSHOT_DIR):
+    """Return (data, manifest) from the latest snapshot, or (None, None) if there is none."""
+    manifest = read_manifest(path)
+    if not manifest:
+        return None, None
+    folder = os.path.join(path, manifest['version'])
+    data = {}
+    con = duckdb.connect(database=':memory:')
+    try:
+        for name in manifest.get('tables', {}):
+            data[name] = con.execute("SELECT * FROM read_parquet(?)", [os.path.join(folder, f"{name}.parquet")]).df()
+    except duckdb.Error:
+        return None, None
+    finally:
+        con.close()
+    return data, manifest
+
+# --- DERIVED TABLES ---
+# Tables computed from the snapshot (similarity neighbours, stats, ...) are
+# stored next to it under artifacts/<name>/<key>.parquet, where key
+# identifies the input they were computed from. Only the latest key is kept.
+ARTIFACT_DIR = 'artifacts'
+
+def save_artifact(name, key, df, path=SNAPSHOT_DIR):
+    folder = os.path.join(path, ARTIFACT_DIR, name)
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f"{key}.parquet.tmp")
+    con = duckdb.connect(database=':memory:')
+    try:
+        _write_parquet(con, df, tmp)
+    finally:
+        con.close()
+    os.replace(tmp, os.path.join(folder, f"{key}.parquet"))
+    for f in os.listdir(folder):
+        if f != f"{key}.parquet" and not f.endswith('.tmp'):
+            try: os.remove(os.path.join(folder, f))
+            except OSError: pass
+
+def load_artifact(name, key, path=SNAPSHOT_DIR):
+    file_path = os.path.join(path, ARTIFACT_DIR, name, f"{key}.parquet")
+    if not os.path.exists(file_path):
+        return None
+    con = duckdb.connect(database=':memory:')
+    try:
+        return con.execute("SELECT * FROM read_parquet(?)", [file_path]).df()
+    except duckdb.Error:
+        return None
+    finally:
+        con.close()
+
+class ArtifactCache:
+    """
+    A value computed from the live tables and stored as artifact `name`.
+    get() checks it against version() on every call, but only recomputes it
+    (or re-reads the artifact) when fingerprint() changes:
+      build() -> value, to_frame(value) -> DataFrame, from_frame(df) -> value
+    """
+    def __init__(self, name, version, fingerprint, build, to_frame=None, from_frame=None):
+        self.name = name
+        self.version = version
+        self.fingerprint = fingerprint
+        self.build = build
+        self.to_frame = to_frame or (lambda value: value)
+        self.from_frame = from_frame or (lambda df: df)
+        self._state = {'version': None, 'fingerprint': None, 'value': None}
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = self.version()
+        state = self._state
+        if state['version'] == version:
+            return state['value']
+        with self._lock:
+            state = self._state
+            if state['version'] == version:
+                return state['value']
+            key = self.fingerprint()
+            if state['fingerprint'] == key:
+                value = state['value']
+            else:
+                stored = load_artifact(self.name, key)
+                if stored is not None:
+                    value = self.from_frame(stored)
+                else:
+                    value = self.build()
+                    save_artifact(self.name, key, self.to_frame(value))
+            self._state = {'version': version, 'fingerprint': key, 'value': value}
+            return value
@@ -0,0 +1,100 @@
+#modules/summary_store.py
+"""
+Durable store for LLM summaries (SQLite file, shared by every process).
+
+A summary is stored per (kind, entity_id, template_version, model) together
+with a hash of the review ids it was generated from, and optionally the
+fields parsed out of it (JSON). entity_id is a row id, or a text key for
+summaries about several entities (pair_key). It is served as long
+as that hash still matches, so a summary is only regenerated when the
+entity's reviews change, the prompt template is bumped or the model changes.
+SQLite (in WAL mode) rather than DuckDB because several app processes may
+read and write the file at the same time.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- CONFIG ---
+STORE_FILE = 'data/summaries.sqlite'
+
+def review_hash(review_ids):
+    """Order-independent hash of the review ids a summary is built from."""
+    ids = sorted(int(i) for i in review_ids)
+    return hashlib.sha1(",".join(map(str, ids)).encode('ascii')).hexdigest()
+
+def pair_key(id_a, id_b):
+    """Entity key of a summary about two entities, the same in either order."""
+    return ":".join(str(i) for i in sorted((int(id_a), int(id_b))))
+
+def _entity(entity_id):
+    return entity_id if isinstance(entity_id, str) else int(entity_id)
+
+class SummaryStore:
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _con(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        with self._lock:
+            if not self._ready:
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS summaries (
+                        kind TEXT, entity_id INTEGER, template_version TEXT, model TEXT,
+                        reviews_hash TEXT, summary TEXT, created_at REAL, fields TEXT,
+                        PRIMARY KEY (kind, entity_id, template_version, model)
+                    )""")
+                columns = [row[1] for row in con.execute("PRAGMA table_info(summaries)")]
+                if 'fields' not in columns:  # store file from before the fields column
+                    con.execute("ALTER TABLE summaries ADD COLUMN fields TEXT")
+                con.commit()
+                self._ready = True
+        return con
+
+    def _row(self, column, kind, entity_id, template_version, model, reviews_hash):
+        try:
+            return self._con().execute(
+                f"SELECT {column} FROM summaries WHERE kind=? AND entity_id=? AND template_version=? AND model=? AND reviews_hash=?",
+                [kind, _entity(entity_id), str(template_version), model, reviews_hash]).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def get(self, kind, entity_id, template_version, model, reviews_hash):
+        """Stored summary, or None if missing or built from other reviews."""
+        row = self._row('summary', kind, entity_id, template_version, model, reviews_hash)
+        return row[0] if row else None
+
+    def get_fields(self, kind, entity_id, template_version, model, reviews_hash):
+        """Parsed fields stored with the summary (dict), or None."""
+        row = self._row('fields', kind, entity_id, template_version, model, reviews_hash)
+        return json.loads(row[0]) if row and row[0] else None
+
+    def put(self, kind, entity_id, template_version, model, reviews_hash, summary, fields=None):
+        """Store (or replace the outdated) summary of an entity."""
+        try:
+            con = self._con()
+            con.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [kind, _entity(entity_id), str(template_version), model, reviews_hash, summary, time.time(),
+                         json.dumps(fields, ensure_ascii=False) if fields is not None else None])
+            con.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        try:
+            rows = self._con().execute("SELECT kind, COUNT(*) FROM summaries GROUP BY kind").fetchall()
+        except sqlite3.Error:
+            return {}
+        return dict(rows)
@@ -0,0 +1,92 @@
+#modules/write_queue.py
+"""
+Write-behind queue for follow / unfollow updates.
+
+Clicks only record what changed; a background thread pushes the
+accumulated changes to Google Sheets in one batch every FLUSH_INTERVAL
+seconds, or sooner once MAX_PENDING rows are waiting.
+  - follower counts are coalesced into one +/- delta per reviewer
+  - followed lists keep only the latest value per user
+"""
+import atexit
+import threading
+
+# --- CONFIG ---
+FLUSH_INTERVAL = 5
+MAX_PENDING = 50
+
+class WriteQueue:
+    def __init__(self, flush_fn, interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        """flush_fn(follower_deltas, followed_lists) writes one batch; raising keeps the batch queued."""
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self._follower_deltas = {}
+        self._followed_lists = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add_follower_delta(self, reviewer_id, delta):
+        with self._lock:
+            total = self._follower_deltas.get(reviewer_id, 0) + delta
+            if total:
+                self._follower_deltas[reviewer_id] = total
+            else:
+                self._follower_deltas.pop(reviewer_id, None)
+        self._after_add()
+
+    def set_followed_list(self, user_id, followed_ids):
+        with self._lock:
+            self._followed_lists[user_id] = list(followed_ids)
+        self._after_add()
+
+    def pending(self):
+        with self._lock:
+            return len(self._follower_deltas) + len(self._followed_lists)
+
+    def _after_add(self):
+        self._start()
+        if self.pending() >= self.max_pending:
+            self._wake.set()
+
+    def _take(self):
+        with self._lock:
+            batch = (self._follower_deltas, self._followed_lists)
+            self._follower_deltas, self._followed_lists = {}, {}
+        return batch
+
+    def _requeue(self, follower_deltas, followed_lists):
+        with self._lock:
+            for rid, delta in follower_deltas.items():
+                self._follower_deltas[rid] = self._follower_deltas.get(rid, 0) + delta
+            for uid, ids in followed_lists.items():
+                # a newer value queued meanwhile wins
+                self._followed_lists.setdefault(uid, ids)
+
+    def flush(self):
+        """Push everything queued so far. Returns False if the batch had to be re-queued."""
+        with self._flush_lock:
+            follower_deltas, followed_lists = self._take()
+            if not follower_deltas and not followed_lists:
+                return True
+            try:
+                self.flush_fn(follower_deltas, followed_lists)
+                return True
+            except Exception:
+                self._requeue(follower_deltas, followed_lists)
+                return False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="sheet-write-queue")
+                self._thread.start()
+                atexit.register(self.flush)
@@ -1,14 +1,16 @@
 #pages/2_Restaurant.py
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from modules import db_manager, auth, nav
+from modules import db_manager, auth, nav, similarity, prompts
 
 # --- CONFIG & INIT ---
 st.set_page_config(page_title="Restaurant Detail", layout="wide")
 nav.inject_custom_css()
 auth.init_session_state()
 
+# Average rating of the reviews mentioning each aspect (modules/aspects.py)
+ASPECT_LABELS = {'food': "🍛 อาหาร", 'service': "🙋 บริการ", 'ambience': "🌅 บรรยากาศ", 'price': "💰 ราคา"}
+
 # --- PARAMETERS ---
 res_id = nav.get_param("id", type_cast=int)
 if not res_id:
@@ -37,6 +39,7 @@ m3.info(f"Metadata: Not Available")
 #m3.info(f"Metadata: {restaurant.get('metadata', '-')}")
 
 # --- AI SUMMARY ---
+ai_panel, ai_tokens = None, None
 if auth.get_user_mode() == 'AI':
     with st.container(border=True):
         st.subheader("🤖 AI Summary (สำหรับสมาชิก)")
@@ -45,42 +48,34 @@ if auth.get_user_mode() == 'AI':
         ai_summary_text = "กำลังวิเคราะห์ข้อมูล..."
         
         if not reviews.empty and 'content' in reviews.columns:
-            valid_reviews = reviews[reviews['content'].astype(str).str.len() > 5]
-            text_data = " ".join(valid_reviews['content'].astype(str).tolist()) # Use all/more content logic if needed
-            
-            # Use same limit as Compare Page for cache hit
-            if len(text_data) > 10000: 
-                text_data = text_data[:10000] + "..."
+            # --- STANDARD PROMPT (Shared with Compare Page and precompute_summaries.py) ---
+            built = prompts.restaurant_summary_prompt(reviews)
                 
-            if len(text_data) < 10:
+            if built is None:
                 st.info("ข้อมูลรีวิวน้อยเกินไปสำหรับการวิเคราะห์")
             else:
-                # --- STANDARD PROMPT (Shared with Compare Page) ---
-                user_prompt = f"""
-                Analyze the following restaurant reviews and summarize in Thai language only.
-                Keep it concise. Use the exact format below.
-                Do it without intro and footnote.
-                Question back is not allow either.
-
-                Reviews:
-                "{text_data}"
-
-                Format:
-                **ภาพรวม:** [Summary in 1 sentence, Thai language]
-                - **🍛 เมนูแนะนำ:** [List specific food names found in text in Thai language]
-                - **⏰ ช่วงเวลาที่ควรไป:** [Time/Meal in Thai language]
-                - **🌅 บรรยากาศ:** [Atmosphere in Thai language]
-                - **👨‍👩‍👧‍👦 เหมาะสำหรับ:** [Customer type in Thai language]
-                """
-                
-                with st.spinner("🤖 AI กำลังอ่านรีวิว..."):
-                    ai_response = db_manager.get_ollama_text_response(user_prompt)
-                
-                st.markdown(ai_response)
+                review_ids, user_prompt = built
+                # Starts in the background now; streamed into the panel at the end of the page.
+                # Stored per restaurant until its reviews change
+                ai_panel = nav.AIPanel(waiting_text="🤖 AI กำลังอ่านรีวิว...")
+                ai_tokens = db_manager.stream_entity_summary('restaurant', res_id, review_ids, user_prompt)
         else:
             st.info("ยังไม่มีข้อมูลรีวิวให้วิเคราะห์")
 
 else:
+    # --- INSTANT SUMMARY (no AI): aspect scores extracted from all reviews ---
+    review_aspects = db_manager.get_restaurant_aspects(res_id)
+    if review_aspects and review_aspects['aspects']:
+        with st.container(border=True):
+            st.subheader("📝 สรุปจากรีวิว")
+            asp_cols = st.columns(len(ASPECT_LABELS))
+            for col, (aspect, label) in zip(asp_cols, ASPECT_LABELS.items()):
+                if aspect in review_aspects['aspects']:
+                    score, mentions = review_aspects['aspects'][aspect]
+                    col.metric(label, f"{score:.1f} ⭐")
+                    col.caption(f"จาก {mentions} รีวิวที่พูดถึง")
+                else:
+                    col.metric(label, "-")
     st.subheader("🔒 เข้าสู่ระบบ AI Mode เพื่อดูบทวิเคราะห์ร้านอาหารโดยละเอียด")
 
 st.divider()
@@ -89,6 +84,10 @@ st.divider()
 st.markdown("##### Keywords: กดคำเพื่อใช้เป็นตัวกรอง")
 kw_cols = st.columns(8) 
 keywords = [kw.strip() for kw in str(restaurant.get('keywords', '')).split(',') if kw.strip()]
+if not keywords:
+    # sheet without a keywords column filled in: use the ones extracted from the reviews
+    review_aspects = db_manager.get_restaurant_aspects(res_id) or {}
+    keywords = [kw.strip() for kw in str(review_aspects.get('keywords', '')).split(',') if kw.strip()]
 
 for i, kw in enumerate(keywords):
     if i < 8:
@@ -174,8 +173,9 @@ filtered_reviews = reviews.copy()
 if st.session_state['chart_filter_rating']:
     filtered_reviews = filtered_reviews[filtered_reviews['rating'] == int(st.session_state['chart_filter_rating'])]
 if st.session_state['chart_filter_month']:
-    filtered_reviews['ym'] = filtered_reviews['timestamp'].dt.strftime('%Y-%m')
-    filtered_reviews = filtered_reviews[filtered_reviews['ym'] == str(st.session_state['chart_filter_month'])]
+    # 'YYYY-MM' -> month_key (YYYYMM), compared against the integer column
+    month_key = int(str(st.session_state['chart_filter_month']).replace('-', ''))
+    filtered_reviews = filtered_reviews[filtered_reviews['month_key'] == month_key]
 
 # 2. Sort
 filter_mode = st.radio(
@@ -244,7 +244,7 @@ st.divider()
 
 # --- SIMILAR RESTAURANTS ---
 st.subheader("🔗 ร้านแนะนำอื่นๆ")
-similar_res = db_manager.calculate_similarity_restaurants(res_id, top_n=5) 
+similar_res = similarity.get_similar_restaurants(res_id, top_n=5)
 cols_row1 = st.columns(3)
 cols_row2 = st.columns(3)
 all_slots = cols_row1 + cols_row2
@@ -266,4 +266,9 @@ with all_slots[5]:
         st.markdown("### 🔍")
         st.markdown("**ค้นหาร้านโดนใจอื่นๆ**")
         if st.button("ไปหน้าค้นหา", key="search_more", type="primary", use_container_width=True):
-            nav.navigate_to("App.py")
\ No newline at end of file
+            nav.navigate_to("App.py")
+
+# --- AI SUMMARY STREAM ---
+# Last, so the whole page is already shown while the answer is generated
+if ai_tokens is not None:
+    ai_panel.stream(ai_tokens)
@@ -1,7 +1,7 @@
 #pages/2_Restaurant_Compare.py
 import streamlit as st
 import pandas as pd
-from modules import db_manager, auth, nav
+from modules import db_manager, auth, nav, prompts
 
 st.set_page_config(page_title="Compare Restaurants", layout="wide")
 nav.inject_custom_css()
@@ -48,88 +48,30 @@ if not res_id_1 or not res_id_2:
     st.stop()
 
 # --- DATA FETCHING & AI PROCESSING ---
-def get_ai_analysis_for_restaurant(rid, rname):
-    """
-    Reuse the exact logic/prompt from Page 2 to hit the cache.
-    """
-    reviews = db_manager.get_reviews_for_restaurant(rid)
-    if not reviews.empty and 'content' in reviews.columns:
-        valid_reviews = reviews[reviews['content'].astype(str).str.len() > 5]
-        text_data = " ".join(valid_reviews['content'].astype(str).tolist())
-        
-        # Use exact logic as page 2 to ensure cache hit
-        if len(text_data) > 10000: text_data = text_data[:10000] + "..."
-        if len(text_data) < 10: return None
-        
-        # SAME PROMPT AS PAGE 2
-        user_prompt = f"""
-                Analyze the following restaurant reviews and summarize in Thai language only.
-                Keep it concise. Use the exact format below.
-                Do it without intro and footnote.
-                Question back is not allow either.
+# Same prompt as Page 2 (modules/prompts.py), so the stored summary is shared;
+# its fields (overview, menu, ...) are parsed once, when it is stored.
+NO_DATA = {field: "-" for field in prompts.RESTAURANT_FIELDS}
 
-                Reviews:
-                "{text_data}"
-
-                Format:
-                **ภาพรวม:** [Summary in 1 sentence, Thai language]
-                - **🍛 เมนูแนะนำ:** [List specific food names found in text in Thai language]
-                - **⏰ ช่วงเวลาที่ควรไป:** [Time/Meal in Thai language]
-                - **🌅 บรรยากาศ:** [Atmosphere in Thai language]
-                - **👨‍👩‍👧‍👦 เหมาะสำหรับ:** [Customer type in Thai language]
-                """
-        return db_manager.get_ollama_text_response(user_prompt)
-    return None
-
-def parse_ai_response(text):
-    """Parse the specific AI format into a dictionary."""
-    data = {
-        "Overview": "-", "Menu": "-", "Time": "-", "Ambient": "-", "Group": "-"
-    }
-    if not text: return data
-    
-    try:
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            if "**ภาพรวม:**" in line:
-                data['Overview'] = line.split(":", 1)[1].strip()
-            elif "เมนูแนะนำ:" in line:
-                data['Menu'] = line.split(":", 1)[1].strip()
-            elif "ช่วงเวลาที่ควรไป:" in line:
-                data['Time'] = line.split(":", 1)[1].strip()
-            elif "บรรยากาศ:" in line:
-                data['Ambient'] = line.split(":", 1)[1].strip()
-            elif "เหมาะสำหรับ:" in line:
-                data['Group'] = line.split(":", 1)[1].strip()
-    except:
-        pass # Fallback to default
-    return data
-
-# Action
-if st.button("🚀 เริ่มเปรียบเทียบ", type="primary", use_container_width=True):
-    
+def show_comparison(res_id_1, res_id_2):
     # 1. Basic Stats
     r1 = db_manager.get_restaurant_detail(res_id_1)
     r2 = db_manager.get_restaurant_detail(res_id_2)
     
-    # 2. AI Analysis (Hit Cache if visited page 2 before, or Gen new)
+    # 2. AI Analysis - stored ones right away, missing ones generated side by side
     with st.spinner("🤖 AI กำลังรวบรวมข้อมูล..."):
-        raw_ai_1 = get_ai_analysis_for_restaurant(res_id_1, r1['name'])
-        raw_ai_2 = get_ai_analysis_for_restaurant(res_id_2, r2['name'])
-        
-    ai_data_1 = parse_ai_response(raw_ai_1)
-    ai_data_2 = parse_ai_response(raw_ai_2)
+        analyses = db_manager.get_restaurant_analyses([res_id_1, res_id_2])
+    ai_data_1 = analyses[res_id_1][1] or NO_DATA
+    ai_data_2 = analyses[res_id_2][1] or NO_DATA
 
     # 3. Construct Table Data
     table_data = [
         {"หัวข้อ": "จำนวนรีวิว", r1['name']: f"{r1['review_count']} 📝", r2['name']: f"{r2['review_count']} 📝"},
         {"หัวข้อ": "คะแนนเฉลี่ย", r1['name']: f"{r1['average_rating']:.2f} ⭐", r2['name']: f"{r2['average_rating']:.2f} ⭐"},
-        {"หัวข้อ": "ภาพรวม", r1['name']: ai_data_1['Overview'], r2['name']: ai_data_2['Overview']},
-        {"หัวข้อ": "🍛 เมนูแนะนำ", r1['name']: ai_data_1['Menu'], r2['name']: ai_data_2['Menu']},
-        {"หัวข้อ": "⏰ ช่วงเวลาที่ควรไป", r1['name']: ai_data_1['Time'], r2['name']: ai_data_2['Time']},
-        {"หัวข้อ": "🌅 บรรยากาศ", r1['name']: ai_data_1['Ambient'], r2['name']: ai_data_2['Ambient']},
-        {"หัวข้อ": "👨‍👩‍👧‍👦 เหมาะสำหรับ", r1['name']: ai_data_1['Group'], r2['name']: ai_data_2['Group']},
+        {"หัวข้อ": "ภาพรวม", r1['name']: ai_data_1['overview'], r2['name']: ai_data_2['overview']},
+        {"หัวข้อ": "🍛 เมนูแนะนำ", r1['name']: ai_data_1['menu'], r2['name']: ai_data_2['menu']},
+        {"หัวข้อ": "⏰ ช่วงเวลาที่ควรไป", r1['name']: ai_data_1['time'], r2['name']: ai_data_2['time']},
+        {"หัวข้อ": "🌅 บรรยากาศ", r1['name']: ai_data_1['ambience'], r2['name']: ai_data_2['ambience']},
+        {"หัวข้อ": "👨‍👩‍👧‍👦 เหมาะสำหรับ", r1['name']: ai_data_1['audience'], r2['name']: ai_data_2['audience']},
     ]
     
     df_compare = pd.DataFrame(table_data)
@@ -140,18 +82,10 @@ if st.button("🚀 เริ่มเปรียบเทียบ", type="prim
     # 4. Final Comparison Summary
     st.subheader("💡 บทสรุปการเปรียบเทียบ")
     
-    summary_prompt = f"""
-    Compare these two restaurants based on the data below and give a recommendation in Thai.
-    
-    Restaurant A ({r1['name']}): {r1['average_rating']} Stars. {ai_data_1}
-    Restaurant B ({r2['name']}): {r2['average_rating']} Stars. {ai_data_2}
-    
-    Output Format:
-    **ความเหมือน:** ...
-    **ความต่าง:** ...
-    **คำแนะนำ:** เลือกร้าน A ถ้า... / เลือกร้าน B ถ้า...
-    """
-    
-    with st.spinner("⚖️ AI กำลังสรุปผลการตัดสิน..."):
-        final_verdict = db_manager.get_ollama_text_response(summary_prompt)
-        st.info(final_verdict)
\ No newline at end of file
+    # Stored per pair (A/B and B/A share it); otherwise streamed as it is generated
+    with st.container(border=True):
+        st.write_stream(db_manager.stream_compare_verdict(r1, analyses[res_id_1], r2, analyses[res_id_2]))
+
+# Action
+if st.button("🚀 เริ่มเปรียบเทียบ", type="primary", use_container_width=True):
+    show_comparison(res_id_1, res_id_2)
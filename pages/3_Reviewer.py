@@ -1,7 +1,6 @@
 #pages/3_Reviewer.py
 import streamlit as st
-import pandas as pd
-from modules import db_manager, auth, nav
+from modules import db_manager, auth, nav, similarity, prompts
 
 st.set_page_config(page_title="Reviewer Profile", layout="wide")
 nav.inject_custom_css()
@@ -19,8 +18,8 @@ if not reviewer:
     if st.button("⬅️ กลับหน้าหลัก"): nav.navigate_to("App.py")
     st.stop()
     
-reviews = db_manager.get_reviews_by_reviewer_name(reviewer['name'])
-avg_given = db_manager.get_average_rating_given(reviewer['name'])
+reviews = db_manager.get_reviews_by_reviewer(rev_id)
+avg_given = db_manager.get_average_rating_given(rev_id)
 
 # --- LOGIC ---
 def handle_follow_click(target_id):
@@ -59,58 +58,24 @@ with c2:
 st.divider()
 
 # --- AI SUMMARY ---
+ai_panel, ai_tokens = None, None
 with st.container(border=True):
     if auth.get_user_mode() == 'AI':
             st.subheader("🤖 AI Analysis: สไตล์นักชิม")
             
             # 1. Extract content (Not Rating!)
             if not reviews.empty and 'content' in reviews.columns:
-                # Filter out empty or too short reviews
-                valid_reviews = reviews[reviews['content'].astype(str).str.len() > 5]
-                
-                # 2. Limit Data Size: Take top 15 recent reviews to keep input tokens low (~300-500 tokens)
-                # This ensures processing time < 15s on CPU
-                text_data = " ".join(valid_reviews['content'].astype(str).tolist())
-                rating_data = valid_reviews['rating'].astype(int).tolist()
-                
-                # 3. Hard Limit Characters: Just in case reviews are very long paragraphs
-                if len(text_data) > 10000: 
-                    text_data = text_data[:10000] + "..."
+                # Reviews text + ratings, capped in size (modules/prompts.py)
+                built = prompts.reviewer_summary_prompt(reviewer['name'], reviews)
                     
-                if len(text_data) < 10:
+                if built is None:
                     st.info("ข้อมูลรีวิวน้อยเกินไปสำหรับการวิเคราะห์")
                 else:
-                    # --- OPTIMIZED PROMPT FOR SMALL MODEL (1B/2B) ---
-                    # Strategy: Direct instruction + Data + Output Template
-                    user_prompt = f"""
-                    Analyze the following restaurant reviews of reviewer: {reviewer['name']} 
-                    and summarize about the reviewer in Thai language only.
-                    Keep it concise. Use the exact format below.
-                    Do it without intro and footnote.
-                    Question back is not allow.
-
-                    Reviews:
-                    "{text_data}"
-
-                    Rating:
-                    "{rating_data=}"
-
-                    Format:
-                    จากการวิเคราะห์ประวัติการรีวิวของ **{reviewer['name']}**:
-                    - **🍛 แนวอาหารที่ชอบ:** [A kind of food reviewer interest, if the pattern don't clear, show as N/A.
-                    Don't show that information unless they're >= 85% confident about it. 
-                    Don't conclude the reviewer like Thai food unless they're at least 1 word of "Thai" appear in Reviews.
-                    ]
-                    - **⭐ สไตล์การให้คะแนน:** [Reviewer rating bahavior in Thai language]
-                    - **📍 [Other interesting fact(s)]              
-
-                    """
-                    
-                    # Call AI
-                    with st.spinner("🤖 AI กำลังอ่านรีวิว..."):
-                        ai_response = db_manager.get_ollama_text_response(user_prompt)
-                    
-                    st.markdown(ai_response)
+                    review_ids, user_prompt = built
+                    # Starts in the background now; streamed into the panel at the end of the page.
+                    # Stored per reviewer until their reviews change
+                    ai_panel = nav.AIPanel(waiting_text="🤖 AI กำลังอ่านรีวิว...")
+                    ai_tokens = db_manager.stream_entity_summary('reviewer', rev_id, review_ids, user_prompt)
             else:
                 st.info("ยังไม่มีข้อมูลรีวิวให้วิเคราะห์")
     else:
@@ -121,7 +86,7 @@ st.divider()
 # --- REVISITED ---
 st.subheader("🔁 ร้านที่ไปรีวิวซ้ำ")
 if auth.get_user_mode() == 'AI':
-    revisited = db_manager.get_revisited_restaurants(reviewer['name'])
+    revisited = db_manager.get_revisited_restaurants(rev_id)
     if not revisited.empty:
         for _, r in revisited.iterrows():
             st.write(f"📍 **{r['name']}** - {r['visit_count']} ครั้ง (ล่าสุด: {r['last_visit'].strftime('%Y-%m-%d')})")
@@ -184,7 +149,7 @@ st.divider()
 
 # --- SIMILAR REVIEWERS ---
 st.subheader("🧑‍🍳 นักชิมที่คล้ายกัน")
-sim_revs = db_manager.get_similar_reviewers_content_based(rev_id, top_n=2)
+sim_revs = similarity.get_similar_reviewers(rev_id, top_n=2)
 col_sim, col_search = st.columns([2, 1])
 
 with col_sim:
@@ -196,7 +161,7 @@ with col_sim:
             with s_cols[i % 2]:
                 with st.container(border=True):
                     st.write(f"**{sr['name']}**")
-                    st.caption(f"ตรงกัน {sr['common_restaurants']} ร้าน")
+                    st.caption(f"ความคล้าย {sr['similarity']:.0%}")
                     if st.button("ดูโปรไฟล์", key=f"sim_{sr['reviewer_id']}", use_container_width=True):
                         nav.navigate_to("pages/3_Reviewer.py", {"id": sr['reviewer_id']})
     else:
@@ -207,4 +172,9 @@ with col_search:
         st.markdown("### 🔍")
         st.markdown("**ค้นหานักชิมอื่นๆ เพิ่มเติม**")
         if st.button("ไปหน้าค้นหา", key="search_all", type="primary", use_container_width=True):
-            nav.navigate_to("App.py")
\ No newline at end of file
+            nav.navigate_to("App.py")
+
+# --- AI SUMMARY STREAM ---
+# Last, so the whole page is already shown while the answer is generated
+if ai_tokens is not None:
+    ai_panel.stream(ai_tokens)
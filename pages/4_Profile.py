@@ -1,6 +1,7 @@
 #pages/4_Profile.py
 
 import streamlit as st
+import pandas as pd
 from modules import auth, db_manager, nav
 
 st.set_page_config(page_title="My Profile", layout="wide")
@@ -31,14 +32,19 @@ st.divider()
 st.subheader("👥 นักชิมที่คุณติดตาม")
 f_ids = st.session_state['followed_ids']
 if f_ids:
+    # One query for every followed reviewer instead of one lookup per card
+    cards = db_manager.get_reviewer_cards(f_ids)
+    found = {} if cards.empty else {int(r['reviewer_id']): r for _, r in cards.iterrows()}
     cols = st.columns(3)
     for i, fid in enumerate(f_ids):
         with cols[i % 3]:
-            rev = db_manager.get_reviewer_detail(fid)
-            if rev:
+            rev = found.get(int(fid))
+            if rev is not None:
                 with st.container(border=True):
                     st.write(f"**{rev['name']}**")
                     st.caption(f"🫂 {rev['followers']} ผู้ติดตาม")
+                    if pd.notna(rev['latest_restaurant_name']):
+                        st.caption(f"📝 ล่าสุด: {rev['latest_restaurant_name']} {'⭐' * int(rev['latest_rating'])}")
                     if st.button("ดูโปรไฟล์", key=f"my_f_{fid}", use_container_width=True):
                         nav.navigate_to("pages/3_Reviewer.py", {"id": fid})
             else:
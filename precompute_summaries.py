@@ -0,0 +1,137 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules import db_manager, prompts, fake_llm
+
+# --- 1. SETUP & CONFIG ---
+# Generates the AI summaries of the restaurant / reviewer pages ahead of time
+# and writes them to the summary store (data/summaries.sqlite), so visitors
+# don't wait for the model on first view.
+#
+#   python precompute_summaries.py                      # everything, 2 workers
+#   python precompute_summaries.py --kinds restaurant --limit 20
+#   python precompute_summaries.py --fake               # dry run without Ollama
+#
+# Every finished summary is stored right away; an interrupted run simply
+# continues where it stopped, because entities whose stored summary matches
+# their current reviews (same review-id fingerprint, template and model)
+# are skipped.
+WORKERS = 2            # parallel requests to the Ollama server
+MIN_REVIEWS = 3        # reviewers with fewer reviews are not precomputed
+REPORT_EVERY = 10      # progress line every N summaries
+
+def restaurant_jobs():
+    ids = db_manager.get_db().execute("SELECT id FROM restaurants ORDER BY review_count DESC, id").df()['id']
+    for rid in ids:
+        built = prompts.restaurant_summary_prompt(db_manager.get_reviews_for_restaurant(int(rid)))
+        if built:
+            yield 'restaurant', int(rid), built
+
+def reviewer_jobs(min_reviews):
+    rows = db_manager.get_db().execute("""
+        SELECT rv.reviewer_id, rv.name FROM reviewers rv
+        JOIN reviewer_stats s ON rv.reviewer_id = s.reviewer_id
+        WHERE s.review_count >= ? ORDER BY s.review_count DESC, rv.reviewer_id
+    """, [min_reviews]).fetchall()
+    for rev_id, name in rows:
+        built = prompts.reviewer_summary_prompt(name, db_manager.get_reviews_by_reviewer(int(rev_id)))
+        if built:
+            yield 'reviewer', int(rev_id), built
+
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.output_tokens = 0
+        self.token_seconds = 0.0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, ok, output_tokens=0, seconds=0.0):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            self.output_tokens += output_tokens
+            self.token_seconds += seconds
+            if self.done % REPORT_EVERY == 0 or self.done == self.total:
+                print(f"   ⏱️ {self.line()}")
+
+    def line(self):
+        elapsed = time.perf_counter() - self.start
+        per_min = self.done / elapsed * 60 if elapsed else 0.0
+        # tokens/s per request (model speed), not summed over the parallel workers
+        tok_s = self.output_tokens / self.token_seconds if self.token_seconds else 0.0
+        return (f"{self.done}/{self.total} done, {self.failed} failed | "
+                f"{per_min:.1f} summaries/min | {tok_s:.1f} tokens/s | {elapsed:.0f}s elapsed")
+
+def run_job(kind, entity_id, review_ids, user_prompt, progress):
+    stats = {}
+    start = time.perf_counter()
+    try:
+        text = db_manager.chat_once(user_prompt, stats=stats)
+    except Exception as e:
+        print(f"   ❌ {kind} {entity_id}: {e}")
+        progress.add(False)
+        return
+    seconds = time.perf_counter() - start
+    # token count estimated from the text when the backend doesn't report it
+    tokens = stats.get('output_tokens') or len(text.split())
+    db_manager.store_summary(kind, entity_id, review_ids, text)
+    progress.add(True, tokens, seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AI summaries into the summary store.")
+    parser.add_argument('--kinds', nargs='+', default=['restaurant', 'reviewer'], choices=['restaurant', 'reviewer'])
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--min-reviews', type=int, default=MIN_REVIEWS)
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many new summaries")
+    parser.add_argument('--fake', action='store_true', help="use fake_llm.FakeChat instead of Ollama")
+    args = parser.parse_args()
+
+    if args.fake:
+        db_manager.set_chat_backend(fake_llm.FakeChat())
+
+    print("📂 Loading data...")
+    sources = []
+    if 'restaurant' in args.kinds:
+        sources.append(restaurant_jobs())
+    if 'reviewer' in args.kinds:
+        sources.append(reviewer_jobs(args.min_reviews))
+
+    print("🔎 Checking stored summaries...")
+    todo, skipped = [], 0
+    for source in sources:
+        for kind, entity_id, (review_ids, user_prompt) in source:
+            if db_manager.get_stored_summary(kind, entity_id, review_ids) is not None:
+                skipped += 1
+                continue
+            todo.append((kind, entity_id, review_ids, user_prompt))
+            if args.limit and len(todo) >= args.limit:
+                break
+        if args.limit and len(todo) >= args.limit:
+            break
+    print(f"   {len(todo)} to generate, {skipped} unchanged (skipped)")
+    if not todo:
+        print("🎉 Nothing to do!")
+        return
+
+    print(f"🤖 Generating with {args.workers} workers...")
+    progress = Progress(len(todo))
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_job, *job, progress) for job in todo]
+        try:
+            for f in as_completed(futures):
+                f.result()
+        except KeyboardInterrupt:
+            print("⏹️ Stopping - finished summaries are stored, run again to continue.")
+            for f in futures:
+                f.cancel()
+            raise
+
+    print(f"🎉 Done: {progress.line()}")
+
+if __name__ == "__main__":
+    main()
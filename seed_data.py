@@ -1,23 +1,44 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import duckdb
 import pandas as pd
 import gspread
+import requests
 from oauth2client.service_account import ServiceAccountCredentials
 import numpy as np
-import re
-from collections import Counter
-import string
-import nltk
-from nltk.corpus import stopwords
+from modules import aspects, snapshot
 
 # --- 1. SETUP & CONFIG ---
 SERVICE_ACCOUNT_FILE = 'service_account.json'
 SHEET_NAME = 'Restaurant_DB' # ชื่อ Google Sheet ปลายทาง
 CSV_FILE = 'data/source_reviews.csv'
-
-# Download NLTK data for keyword extraction (run once)
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+#
+#   python seed_data.py                      # seed the sheet from CSV_FILE
+#   python seed_data.py --csv big.csv --workers 8
+#   python seed_data.py --target snapshot   # local snapshot only, no Google Sheets
+#
+# The CSV is read in chunks of CHUNK_ROWS and prepared in a process pool;
+# each prepared chunk goes straight to a DuckDB staging file in a temporary
+# directory, so memory use doesn't grow with the CSV. Keywords are computed
+# per group of restaurants in the same pool. Sheets
+# are uploaded in BATCH_ROWS-row calls, each retried with backoff. Progress
+# is saved after every batch, so an interrupted run continues where it
+# stopped when started again with the same CSV (--restart to start over).
+CHUNK_ROWS = 50000
+BATCH_ROWS = 5000          # rows per Sheets update call
+WORKERS = os.cpu_count() or 2
+MAX_RETRIES = 5            # per batch; waits 2, 4, 8, ... seconds
+PROGRESS_FILE = 'data/seed_progress.json'
+# Default accounts written to the 'users' sheet / table
+USERS_HEADER = ['id', 'username', 'email', 'password_hash', 'followed_reviewers']
+DEFAULT_USERS = [
+    [1, 'admin', 'admin@example.com', '$2b$12$EXAMPLEHASH...', ''],   # Mock Admin User
+    [2, 'demo_user', 'demo@test.com', 'pass123', '1,3,5'],           # Mock User with multiple follows (Test Case)
+]
 
 def connect_gsheet():
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -25,189 +46,348 @@ def connect_gsheet():
     client = gspread.authorize(creds)
     return client.open(SHEET_NAME)
 
-def clean_keywords(text_series):
+def rate(rows, seconds):
+    return f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "-"
+
+# --- 2. READ & PREPARE (one CSV chunk per worker process) ---
+def prepare_chunk(chunk):
+    """Timestamps and follower counts of one CSV chunk (runs in the process pool)."""
+    out = pd.DataFrame({
+        'restaurant': chunk['Restaurant'],
+        'reviewer': chunk['Reviewer'] if 'Reviewer' in chunk.columns else np.nan,
+        'rating': chunk['Rating'],
+        'content': chunk['Review'],
+        # YYYY-MM-DD HH:MM:SS, a format Google Sheets understands
+        'timestamp': pd.to_datetime(chunk['Time'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'pictures': chunk['Pictures'].fillna(0),
+        'metadata': chunk['Metadata'] if 'Metadata' in chunk.columns else "",
+    })
+    # followers from reviewer metadata, e.g. "1 Review , 5 Followers"
+    followers = out['metadata'].astype(str).str.extract(r'(\d+)[^,\d]*Follower', expand=False)
+    out['followers'] = pd.to_numeric(followers, errors='coerce').fillna(0).astype(int)
+    return out
+
+# Every prepared chunk is appended to this table (in an on-disk DuckDB
+# staging database) as soon as it is ready; the sheet tables are built
+# from it and the reviews are written out from it range by range.
+STAGED_SCHEMA = ("row BIGINT, restaurant VARCHAR, reviewer VARCHAR, rating VARCHAR, content VARCHAR, "
+                 "timestamp VARCHAR, pictures DOUBLE, metadata VARCHAR, followers INTEGER")
+
+def stage_reviews(csv_file, con, pool, workers, chunk_rows):
     """
-    Smarter Keyword Extraction:
-    Extracts top 10 most frequent meaningful words (nouns/adjectives) 
-    from all reviews of a single restaurant.
+    Prepare the CSV chunk by chunk into the `staged` table; at most 2 chunks
+    per worker are in memory at a time. Returns the number of rows.
     """
-    # Combine all reviews
-    full_text = " ".join(text_series.astype(str).tolist()).lower()
-    
-    # Remove punctuation
-    full_text = full_text.translate(str.maketrans('', '', string.punctuation))
-    
-    # Tokenize and remove stopwords
-    tokens = full_text.split()
-    stop_words = set(stopwords.words('english'))
-    # Add custom stopwords common in reviews but not descriptive
-    custom_stops = {'good', 'great', 'place', 'food', 'service', 'restaurant', 'visit', 'really', 'also', 'nice', 'one', 'get', 'ordered', 'went'}
-    stop_words.update(custom_stops)
-    
-    filtered_tokens = [w for w in tokens if w not in stop_words and len(w) > 3]
-    
-    # Count frequency
-    counter = Counter(filtered_tokens)
-    
-    # Get top 10 most common words (representing Menu, Ambience, etc.)
-    most_common = [word.capitalize() for word, count in counter.most_common(10)]
-    
-    return ", ".join(most_common)
+    start = time.perf_counter()
+    con.execute(f"CREATE TABLE staged ({STAGED_SCHEMA})")
+    pending, rows = [], 0
+
+    def store(future):
+        nonlocal rows
+        part = future.result()
+        # the chunk index is the row number in the CSV
+        con.register('__chunk', part.rename_axis('row').reset_index())
+        con.execute("INSERT INTO staged BY NAME SELECT * FROM __chunk")
+        con.unregister('__chunk')
+        rows += len(part)
+
+    # Rating as text in every chunk (the column mixes stars with words like "Like")
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_rows, dtype={'Rating': str}):
+        pending.append(pool.submit(prepare_chunk, chunk))
+        while len(pending) > 2 * workers:
+            store(pending.pop(0))
+    for future in pending:
+        store(future)
+    print(f"   {rows:,} rows read in {time.perf_counter() - start:.1f}s ({rate(rows, time.perf_counter() - start)})")
+    return rows
+
+# --- 3. BUILD SHEET TABLES ---
+REVIEWS_HEADER = ['id', 'restaurant_id', 'reviewer_name', 'rating', 'content', 'timestamp', 'pictures', 'reviewer_id']
+SHEET_REVIEWS_SQL = """
+    SELECT CAST(s.row + 1 AS INTEGER) AS id, r.restaurant_id, s.reviewer AS reviewer_name, s.rating,
+           s.content, s.timestamp, s.pictures, v.reviewer_id
+    FROM staged s
+    LEFT JOIN restaurant_ids r USING (restaurant)
+    LEFT JOIN reviewer_ids v USING (reviewer)
+"""
+# The same rows typed as the app types sheet rows: unparseable numbers
+# become 0, a missing restaurant / reviewer reference stays NULL
+TYPED_REVIEWS_SQL = f"""
+    SELECT id, restaurant_id, COALESCE(reviewer_name, '') AS reviewer_name,
+           COALESCE(CAST(trunc(TRY_CAST(rating AS DOUBLE)) AS INTEGER), 0) AS rating,
+           COALESCE(content, '') AS content, TRY_CAST(timestamp AS TIMESTAMP) AS timestamp,
+           COALESCE(CAST(trunc(pictures) AS INTEGER), 0) AS pictures, reviewer_id
+    FROM ({SHEET_REVIEWS_SQL})
+"""
+
+def _name_ids(con, table, name_col, id_col, names):
+    """ids 1..n of the sorted names (same as enumerating a groupby), kept in the staging database for the joins."""
+    ids = np.arange(1, len(names) + 1, dtype='int32')
+    con.register('__ids', pd.DataFrame({'name': names, 'id': ids}))
+    try:
+        con.execute(f"CREATE TABLE {table} AS SELECT CAST(name AS VARCHAR) AS {name_col}, "
+                    f"CAST(id AS INTEGER) AS {id_col} FROM __ids")
+    finally:
+        con.unregister('__ids')
+    return ids
+
+def restaurant_aspects(con, pool, workers, chunk_rows, total_rows):
+    """
+    aspects.extract() of the typed reviews, restaurants split over the
+    workers in groups of about chunk_rows reviews (at most 2 per worker
+    in memory).
+    """
+    shards = max(workers, -(-total_rows // chunk_rows))
+    pending, parts = [], []
+    for k in range(shards):
+        shard = con.execute("SELECT restaurant_id, rating, content FROM reviews WHERE restaurant_id % ? = ?",
+                            [shards, k]).df()
+        pending.append(pool.submit(aspects.extract_partial, shard))
+        while len(pending) > 2 * workers:
+            parts.append(pending.pop(0).result())
+    parts.extend(f.result() for f in pending)
+    return aspects.finish(parts)
+
+def build_tables(con, pool, workers, chunk_rows, total_rows):
+    """
+    Restaurant and reviewer tables (in memory, one row per name) and the
+    aspect table; the reviews stay in the staging database as the
+    `reviews` view.
+    """
+    first = con.execute("""
+        SELECT restaurant, first(metadata ORDER BY row) AS metadata FROM staged
+        WHERE restaurant IS NOT NULL GROUP BY restaurant
+    """).df().set_index('restaurant')
+    res_names = np.sort(first.index.to_numpy())
+    ids = _name_ids(con, 'restaurant_ids', 'restaurant', 'restaurant_id', res_names)
+
+    rev_first = con.execute("""
+        SELECT reviewer, first(followers ORDER BY row) AS followers FROM staged
+        WHERE reviewer IS NOT NULL GROUP BY reviewer
+    """).df().set_index('reviewer')
+    rev_names = np.sort(rev_first.index.to_numpy())
+    if len(rev_names) == 0:
+        print("Warning: No 'Reviewer' column found.")
+    rev_ids = _name_ids(con, 'reviewer_ids', 'reviewer', 'reviewer_id', rev_names)
+    con.execute(f"CREATE VIEW reviews AS {TYPED_REVIEWS_SQL}")
 
-def main():
-    print("📂 Reading CSV...")
-    df = pd.read_csv(CSV_FILE)
-    
-    # --- 2. PREPARE REVIEWS DATA (Base) ---
-    print("🧹 Processing Reviews & Timestamp...")
-    # 2.1 Fix Timestamp Format (YYYY-MM-DD HH:MM:SS)
-    df['Time'] = pd.to_datetime(df['Time'], errors='coerce')
-    # Convert to string format compatible with Google Sheets
-    df['Time'] = df['Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    # --- 3. PREPARE RESTAURANTS DATA ---
     print("🏢 Processing Restaurants & Keywords...")
-    # Group by restaurant name
-    restaurant_groups = df.groupby('Restaurant')
-    
-    restaurants_data = []
-    
-    # Create a mapping for Restaurant ID
-    res_id_map = {name: i+1 for i, name in enumerate(restaurant_groups.groups.keys())}
-    
-    for i, (name, group) in enumerate(restaurant_groups):
-        res_id = i + 1
-        
-        # 1.1 Extract Keywords from actual reviews
-        keywords = clean_keywords(group['Review'])
-        
+    # Keywords from actual reviews: TF-IDF words / phrases of each restaurant
+    # against all the others (modules/aspects.py)
+    aspect_table = restaurant_aspects(con, pool, workers, chunk_rows, total_rows)
+    keywords = aspect_table.set_index('restaurant_id')['keywords']
+
+    # Formulas for dynamic updates, evaluated by Sheets (USER_ENTERED).
+    # Assuming in 'reviews' sheet: Col B = restaurant_id, Col D = rating
+    df_restaurants = pd.DataFrame({
+        'id': ids,
+        'name': res_names,
+        'average_rating': [f'=IFERROR(AVERAGEIF(reviews!B:B, {i}, reviews!D:D), 0)' for i in ids],
+        'review_count': [f'=COUNTIF(reviews!B:B, {i})' for i in ids],
+        'keywords': keywords.reindex(ids).fillna("").to_numpy(),
         # Metadata (Take the first one found, usually generic)
-        metadata = group['Metadata'].iloc[0] if 'Metadata' in group.columns else ""
-        
-        # 1.2 Inject Formulas for Dynamic Updates
-        # Assuming in 'reviews' sheet: Col B = restaurant_id, Col D = rating
-        # Row index in sheet starts at 2 (Header is 1). So ID 1 is at Row 2.
-        # Formula: =AVERAGEIF(reviews!B:B, res_id, reviews!D:D)
-        
-        # We store the FORMULA string. gspread 'USER_ENTERED' mode will evaluate it.
-        # Note: We use INDIRECT or just the ID value. Since ID matches Row-1 roughly, 
-        # but to be safe, we hardcode the ID in the formula condition.
-        avg_rating_formula = f'=IFERROR(AVERAGEIF(reviews!B:B, {res_id}, reviews!D:D), 0)'
-        review_count_formula = f'=COUNTIF(reviews!B:B, {res_id})'
-        
-        restaurants_data.append([
-            res_id,                 # id
-            name,                   # name
-            avg_rating_formula,     # average_rating (Formula)
-            review_count_formula,   # review_count (Formula)
-            keywords,               # keywords (Extracted)
-            metadata                # metadata
-        ])
-        
-    df_restaurants = pd.DataFrame(restaurants_data, columns=['id', 'name', 'average_rating', 'review_count', 'keywords', 'metadata'])
-
-    # --- 4. PREPARE REVIEWERS DATA ---
+        'metadata': first['metadata'].reindex(res_names).to_numpy(),
+    })
+
     print("🧑‍🍳 Processing Reviewers & Formulas...")
-    # Extract Reviewer Info
-    # Check if 'Reviewer' column exists
-    if 'Reviewer' in df.columns:
-        # Group by Reviewer Name to handle duplicates
-        reviewer_groups = df.groupby('Reviewer')
-        
-        reviewers_data = []
-        reviewer_id_map = {} # Map Name -> ID
-        
-        for i, (name, group) in enumerate(reviewer_groups):
-            rev_id = i + 1
-            reviewer_id_map[name] = rev_id
-            
-            # Extract followers from Metadata string (e.g., "1 Review , 5 Followers")
-            meta = str(group['Metadata'].iloc[0])
-            followers = 0
-            if 'Followers' in meta:
-                try:
-                    parts = meta.split(',')
-                    for p in parts:
-                        if 'Follower' in p:
-                            followers = int(re.search(r'\d+', p).group())
-                except:
-                    followers = 0
-            
-            # 3.1 Formula for Total Reviews
-            # Assuming in 'reviews' sheet: Col H = reviewer_id (We will add this column)
-            total_reviews_formula = f'=COUNTIF(reviews!H:H, {rev_id})'
-            
-            reviewers_data.append([
-                rev_id,                 # reviewer_id
-                name,                   # name
-                total_reviews_formula,  # total_reviews (Formula)
-                followers               # followers
-            ])
-            
-        df_reviewers = pd.DataFrame(reviewers_data, columns=['reviewer_id', 'name', 'total_reviews', 'followers'])
+    df_reviewers = pd.DataFrame({
+        'reviewer_id': rev_ids,
+        'name': rev_names,
+        # Assuming in 'reviews' sheet: Col H = reviewer_id
+        'total_reviews': [f'=COUNTIF(reviews!H:H, {i})' for i in rev_ids],
+        # followers from the reviewer's first row
+        'followers': rev_first['followers'].reindex(rev_names).to_numpy(),
+    })
+    return df_restaurants, df_reviewers, aspect_table
+
+def sheet_review_rows(con, first, count):
+    """Reviews [first, first + count) in sheet layout."""
+    return con.execute(f"{SHEET_REVIEWS_SQL} WHERE s.row >= ? AND s.row < ? ORDER BY s.row",
+                       [first, first + count]).df()
+
+# --- 4. LOCAL SNAPSHOT (--target snapshot) ---
+def local_tables(con, df_restaurants, df_reviewers):
+    """
+    The sheet tables with the formula columns computed here and every column
+    typed as db_manager.TABLE_SCHEMAS, ready for snapshot.save_snapshot.
+    The reviews are a relation on the staging database, written to the
+    snapshot without going through memory.
+    """
+    # text cells ("Like") don't count in AVERAGEIF but do in COUNTIF, same as Sheets
+    by_restaurant = con.execute("""
+        SELECT restaurant_id, AVG(TRY_CAST(rating AS DOUBLE)) AS average_rating, COUNT(*) AS review_count
+        FROM staged JOIN restaurant_ids USING (restaurant) GROUP BY restaurant_id
+    """).df().set_index('restaurant_id')
+    restaurants = df_restaurants.assign(
+        average_rating=by_restaurant['average_rating'].reindex(df_restaurants['id']).fillna(0.0).to_numpy(),
+        review_count=by_restaurant['review_count'].reindex(df_restaurants['id']).fillna(0).astype('int32').to_numpy(),
+        id=df_restaurants['id'].astype('int32'),
+        keywords=df_restaurants['keywords'].fillna("").astype(str),
+        metadata=df_restaurants['metadata'].fillna("").astype(str),
+    )
+
+    total = con.execute("""
+        SELECT reviewer_id, COUNT(*) AS n FROM staged JOIN reviewer_ids USING (reviewer) GROUP BY reviewer_id
+    """).df().set_index('reviewer_id')['n']
+    reviewers = df_reviewers.assign(
+        reviewer_id=df_reviewers['reviewer_id'].astype('int32'),
+        total_reviews=total.reindex(df_reviewers['reviewer_id']).fillna(0).astype('int32').to_numpy(),
+        followers=df_reviewers['followers'].astype('int32'),
+    )
+
+    users = pd.DataFrame(DEFAULT_USERS, columns=USERS_HEADER).astype({'id': 'int32'})
+    reviews = con.sql("SELECT * FROM reviews ORDER BY id")
+    return {'restaurants': restaurants, 'reviews': reviews, 'reviewers': reviewers, 'users': users}
+
+def save_local(con, tables, aspect_table, path):
+    start = time.perf_counter()
+    manifest = snapshot.save_snapshot(tables, path=path, extra={'source': 'seed_data'})
+    rows = sum(manifest['tables'].values())
+    print(f"   ✅ {rows:,} rows written to {os.path.join(path, manifest['version'])} "
+          f"in {time.perf_counter() - start:.1f}s ({rate(rows, time.perf_counter() - start)})")
+    # stored where the app looks it up, under the fingerprint of the typed reviews (modules/aspects.py)
+    snapshot.save_artifact(aspects.ARTIFACT_NAME, aspects.fingerprint(con), aspect_table, path=path)
+    print(f"   ✅ Aspect scores of {len(aspect_table):,} restaurants saved")
+
+# --- 5. UPLOAD ---
+class SeedProgress:
+    """Rows uploaded per sheet, saved to PROGRESS_FILE for the CSV being seeded."""
+    def __init__(self, csv_file, path=PROGRESS_FILE, restart=False):
+        self.path = path
+        stat = os.stat(csv_file)
+        self.source = f"{os.path.abspath(csv_file)}:{stat.st_size}:{int(stat.st_mtime)}"
+        self.rows = {}
+        if not restart and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+                if saved.get('source') == self.source:
+                    self.rows = saved.get('rows', {})
+            except (OSError, ValueError):
+                pass
+
+    def done(self, sheet):
+        return self.rows.get(sheet, 0)
+
+    def set(self, sheet, rows):
+        self.rows[sheet] = rows
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'source': self.source, 'rows': self.rows}, f)
+        os.replace(tmp, self.path)
+
+    def finish(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def is_transient(e):
+    """Quota (429), server errors (5xx) and dropped connections; anything else fails the same way again."""
+    if isinstance(e, gspread.exceptions.APIError):
+        status = getattr(e.response, 'status_code', None) or e.code
+        return status == 429 or 500 <= status < 600
+    return isinstance(e, (ConnectionError, requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def with_retries(call, *args, **kwargs):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_transient(e):
+                raise
+            wait = 2 ** (attempt + 1)
+            print(f"   ⚠️ {e.__class__.__name__}: {e} - retrying in {wait}s")
+            time.sleep(wait)
+
+def upload_rows(sh, worksheet_name, header, total, read_rows, progress, batch_rows=BATCH_ROWS):
+    """
+    Clear and fill a sheet in batches (USER_ENTERED, so formulas are parsed); resumes after the last saved batch.
+    read_rows(first, count) returns the rows [first, first + count) as a DataFrame.
+    """
+    ws = sh.worksheet(worksheet_name)
+    start_row = progress.done(worksheet_name)
+    if start_row == 0:
+        with_retries(ws.clear)
+        # room for every row up front, updates outside the grid are rejected
+        with_retries(ws.resize, rows=total + 1, cols=len(header))
+        with_retries(ws.update, [list(header)], 'A1')
+    elif start_row >= total:
+        print(f"   ⏭️ '{worksheet_name}' already uploaded")
+        return
     else:
-        print("Warning: No 'Reviewer' column found.")
-        df_reviewers = pd.DataFrame(columns=['reviewer_id', 'name', 'total_reviews', 'followers'])
-
-    # --- 5. FINALIZE REVIEWS TABLE ---
-    print("📝 Finalizing Reviews Table...")
-    # Map IDs back to main DF
-    df['restaurant_id'] = df['Restaurant'].map(res_id_map)
-    df['reviewer_id'] = df['Reviewer'].map(reviewer_id_map)
-    
-    # Rename and Select Columns for 'reviews' sheet
-    # Structure: id, restaurant_id, reviewer_name, rating, content, timestamp, pictures, reviewer_id
-    df_reviews_upload = pd.DataFrame()
-    df_reviews_upload['id'] = range(1, len(df) + 1)
-    df_reviews_upload['restaurant_id'] = df['restaurant_id']
-    df_reviews_upload['reviewer_name'] = df['Reviewer']
-    df_reviews_upload['rating'] = df['Rating']
-    df_reviews_upload['content'] = df['Review']
-    df_reviews_upload['timestamp'] = df['Time']
-    df_reviews_upload['pictures'] = df['Pictures'].fillna(0)
-    df_reviews_upload['reviewer_id'] = df['reviewer_id'] # Col H
+        print(f"   ↪️ '{worksheet_name}': resuming at row {start_row:,}")
+
+    start = time.perf_counter()
+    for first in range(start_row, total, batch_rows):
+        batch = read_rows(first, batch_rows)
+        # NaN is not valid JSON for the Sheets API
+        values = batch.astype(object).where(batch.notna(), "").values.tolist()
+        with_retries(ws.update, values, f"A{first + 2}", value_input_option='USER_ENTERED')
+        progress.set(worksheet_name, first + len(batch))
+        sent = first + len(batch) - start_row
+        print(f"   ⬆️ {worksheet_name}: {first + len(batch):,}/{total:,} rows ({rate(sent, time.perf_counter() - start)})")
+    print(f"   ✅ Uploaded {total} rows to '{worksheet_name}'")
+
+def upload_df(sh, worksheet_name, dataframe, progress, batch_rows=BATCH_ROWS):
+    upload_rows(sh, worksheet_name, dataframe.columns.values.tolist(), len(dataframe),
+                lambda first, count: dataframe.iloc[first:first + count], progress, batch_rows)
+
+def seed(con, args, started):
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        print("📂 Reading CSV...")
+        total_rows = stage_reviews(args.csv, con, pool, args.workers, args.chunk_rows)
+        df_restaurants, df_reviewers, aspect_table = build_tables(con, pool, args.workers, args.chunk_rows, total_rows)
+    print(f"   Tables ready in {time.perf_counter() - started:.1f}s ({rate(total_rows, time.perf_counter() - started)})")
+
+    if args.target == 'snapshot':
+        print("💾 Writing local snapshot...")
+        save_local(con, local_tables(con, df_restaurants, df_reviewers), aspect_table, args.snapshot_dir)
+        print(f"🎉 Data Seeding Completed in {time.perf_counter() - started:.1f}s")
+        return
 
     # --- 6. UPLOAD TO GOOGLE SHEETS ---
     print("☁️ Uploading to Google Sheets...")
     sh = connect_gsheet()
+    progress = SeedProgress(args.csv, restart=args.restart)
+
+    upload_df(sh, 'restaurants', df_restaurants, progress, args.batch_rows)
+    upload_df(sh, 'reviewers', df_reviewers, progress, args.batch_rows)
+    # read back from the staging database one batch at a time
+    upload_rows(sh, 'reviews', REVIEWS_HEADER, total_rows,
+                lambda first, count: sheet_review_rows(con, first, count), progress, args.batch_rows)
 
-    # Function to clear and update sheet with USER_ENTERED option (for formulas)
-    def upload_df(worksheet_name, dataframe):
-        ws = sh.worksheet(worksheet_name)
-        ws.clear()
-        # Upload Header
-        ws.update([dataframe.columns.values.tolist()], 'A1')
-        # Upload Values (using value_input_option='USER_ENTERED' to parse formulas)
-        if not dataframe.empty:
-            data = dataframe.values.tolist()
-            # gspread update using range
-            ws.update('A2', data, value_input_option='USER_ENTERED')
-        print(f"   ✅ Uploaded {len(dataframe)} rows to '{worksheet_name}'")
-
-    upload_df('restaurants', df_restaurants)
-    upload_df('reviewers', df_reviewers)
-    upload_df('reviews', df_reviews_upload)
-    
     # --- 7. USERS SHEET (FIX 4.1) ---
     print("👤 Creating Default Users...")
     ws_users = sh.worksheet('users')
-    ws_users.clear()
-    ws_users.append_row(['id', 'username', 'email', 'password_hash', 'followed_reviewers'])
-    
-    # 4.1 Fix: Ensure followed_reviewers is treated as string even with multiple IDs
-    # We prepend a ' (apostrophe) is one way, but just passing a string "1,2" usually works in gspread
-    # if it doesn't get auto-formatted to date/number.
-    # Safe bet: Use string "1,2" (comma separated).
-    
-    # Mock Admin User
-    ws_users.append_row([1, 'admin', 'admin@example.com', '$2b$12$EXAMPLEHASH...', '']) 
-    
-    # Mock User with multiple follows (Test Case)
-    # Using '1, 2' as a string explicitly
-    ws_users.append_row([2, 'demo_user', 'demo@test.com', 'pass123', '1,3,5']) 
-
-    print("🎉 Data Seeding Completed!")
+    with_retries(ws_users.clear)
+    # followed_reviewers as a comma separated string ("1,3,5"), so Sheets
+    # doesn't turn multiple IDs into a number or date
+    with_retries(ws_users.update, [USERS_HEADER] + DEFAULT_USERS, 'A1')
+    progress.finish()
+
+    total = len(df_restaurants) + len(df_reviewers) + total_rows
+    print(f"🎉 Data Seeding Completed! {total:,} rows in {time.perf_counter() - started:.1f}s "
+          f"({rate(total, time.perf_counter() - started)})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the Google Sheet from the reviews CSV.")
+    parser.add_argument('--csv', default=CSV_FILE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--restart', action='store_true', help="ignore saved upload progress")
+    parser.add_argument('--target', choices=['sheets', 'snapshot'], default='sheets',
+                        help="'snapshot' writes typed tables to --snapshot-dir instead of Google Sheets")
+    parser.add_argument('--snapshot-dir', default=snapshot.SNAPSHOT_DIR)
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as staging:
+        con = duckdb.connect(os.path.join(staging, 'seed.duckdb'))
+        try:
+            seed(con, args, started)
+        finally:
+            con.close()
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,38 @@
+# tests/test_db_manager.py
+import duckdb
+import pandas as pd
+from modules import db_manager
+
+REVIEWS = pd.DataFrame({
+    'id': [1, 2, 3, 4],
+    'restaurant_id': [10, 10, 11, ''],
+    'reviewer_name': ['Ann', 'Ann', 'Bob', 'Ghost'],
+    'rating': [5, 4, 3, 'Like'],
+    'content': ['great', 'fine', 'ok', 'who'],
+    'timestamp': ['2019-05-01 10:00:00', '2019-06-01 10:00:00', '2019-06-02 10:00:00', ''],
+    'pictures': [0, 0, 1, 0],
+    'reviewer_id': [1, 1, '', 'n/a'],
+})
+REVIEWERS = pd.DataFrame({'reviewer_id': [1], 'name': ['Ann'], 'total_reviews': [2], 'followers': [3]})
+
+def _db(reviews=REVIEWS):
+    con = duckdb.connect(database=':memory:')
+    data = db_manager._cast_types({'reviews': reviews, 'reviewers': REVIEWERS})
+    for name in db_manager.TABLE_SCHEMAS:
+        db_manager._materialize(con, name, data.get(name))
+    db_manager._refresh_derived(con)
+    return con
+
+def test_missing_references_stay_null():
+    reviews = db_manager._cast_table('reviews', REVIEWS)
+    assert reviews['reviewer_id'].isna().tolist() == [False, False, True, True]
+    assert reviews['restaurant_id'].isna().tolist() == [False, False, False, True]
+    # other numbers still fall back to 0
+    assert reviews['rating'].tolist() == [5, 4, 3, 0]
+
+def test_review_without_reviewer_id_is_not_a_reviewer():
+    con = _db()
+    assert con.execute("SELECT reviewer_id FROM reviews WHERE id = 3").fetchone() == (None,)
+    stats = con.execute("SELECT reviewer_id, review_count, revisit_count FROM reviewer_stats ORDER BY ALL").fetchall()
+    assert stats == [(1, 2, 1)]
+    assert con.execute("SELECT reviewer_id, restaurant_id, visit_count FROM reviewer_revisits").fetchall() == [(1, 10, 2)]
@@ -0,0 +1,67 @@
+# tests/test_llm_gateway.py
+from types import SimpleNamespace
+import pytest
+from modules import llm_gateway
+from modules.llm_gateway import AllBackendsBusy, ExtractiveSummary, LLMGateway
+
+PROMPT = """Summarize these reviews.
+Reviews:
+- The biryani was rich and the biryani portions were generous.
+- Service was slow but the biryani was worth the wait.
+- Parking near the place is hard to find.
+"""
+
+class FakeClient:
+    def __init__(self, host, fail=False):
+        self.host = host
+        self.fail = fail
+        self.calls = 0
+
+    def chat(self, model, messages, options, keep_alive, stream=False):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.host} unreachable")
+        return SimpleNamespace(message=SimpleNamespace(content=f"answer from {self.host}"),
+                               prompt_eval_count=1, eval_count=1)
+
+def _failing(host):
+    raise RuntimeError("Ollama library not installed")
+
+def test_failed_endpoint_is_skipped():
+    clients = {}
+    def factory(host):
+        clients[host] = FakeClient(host, fail=(host == 'a'))
+        return clients[host]
+
+    gateway = LLMGateway(hosts=['a', 'b'], client_factory=factory)
+    assert gateway(PROMPT) == "answer from b"
+    assert gateway(PROMPT) == "answer from b"
+    # 'a' is down for RETRY_AFTER seconds, so it was only tried once
+    assert clients['a'].calls == 1
+    assert gateway.stats()['backends']['a']['down']
+
+def test_unreachable_falls_back_to_extractive_summary():
+    gateway = LLMGateway(hosts=['a'], client_factory=_failing)
+    answer = gateway(PROMPT)
+    assert isinstance(answer, ExtractiveSummary) and answer.fallback
+    assert "biryani" in answer
+    assert gateway.stats()['fallbacks'] == 1
+
+def test_no_fallback_without_reviews_or_when_disabled():
+    gateway = LLMGateway(hosts=['a'], client_factory=_failing)
+    with pytest.raises(RuntimeError, match="not installed"):
+        gateway("What is the capital of France?")
+    with pytest.raises(RuntimeError):
+        gateway(PROMPT, allow_fallback=False)
+
+def test_saturated_gateway_is_busy():
+    gateway = LLMGateway(hosts=['a', 'b'], max_in_flight=1, client_factory=FakeClient)
+    assert gateway.capacity == 2
+    for backend in gateway.backends:
+        backend.in_flight = 1
+    with pytest.raises(AllBackendsBusy):
+        gateway("no reviews here")
+    assert isinstance(gateway(PROMPT), ExtractiveSummary)
+
+def test_extractive_summary_needs_whole_sentences():
+    assert llm_gateway.extractive_summary("Reviews:\n- ok\n- too short...") is None
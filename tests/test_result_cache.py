@@ -0,0 +1,54 @@
+# tests/test_result_cache.py
+import pandas as pd
+from modules import result_cache
+from modules.result_cache import ResultCache
+
+def _size(value):
+    return result_cache._size_of(value)
+
+def test_lru_eviction_by_bytes():
+    a, b, c = 'a' * 100, 'b' * 100, 'c' * 100
+    cache = ResultCache(max_bytes=_size(a) + _size(b))
+    cache.put(('a',), 1, a)
+    cache.put(('b',), 1, b)
+    assert cache.get(('a',), 1) == (True, a)   # 'a' is now the most recently used
+    cache.put(('c',), 1, c)
+
+    assert cache.get(('b',), 1) == (False, None)
+    assert cache.get(('a',), 1) == (True, a)
+    assert cache.get(('c',), 1) == (True, c)
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2
+    assert stats['bytes'] <= cache.max_bytes
+
+def test_oversized_value_is_not_stored():
+    cache = ResultCache(max_bytes=10)
+    cache.put(('big',), 1, 'x' * 1000)
+    assert cache.get(('big',), 1) == (False, None)
+    assert cache.stats()['bytes'] == 0
+
+def test_new_version_drops_older_entries():
+    cache = ResultCache()
+    cache.put(('a',), 1, 'old')
+    assert cache.get(('a',), 2) == (False, None)
+    assert cache.stats()['entries'] == 0
+    # a late writer still on the old version doesn't bring it back
+    cache.put(('a',), 1, 'old')
+    assert cache.get(('a',), 2) == (False, None)
+
+def test_cached_returns_copies():
+    calls = []
+    version = [1]
+
+    @result_cache.cached(ResultCache(), lambda: version[0])
+    def table(n):
+        calls.append(n)
+        return pd.DataFrame({'x': range(n)})
+
+    first = table(3)
+    first['x'] = 0
+    assert table(3)['x'].tolist() == [0, 1, 2]
+    assert calls == [3]
+    version[0] = 2
+    table(3)
+    assert calls == [3, 3]
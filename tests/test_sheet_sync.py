@@ -0,0 +1,53 @@
+# tests/test_sheet_sync.py
+import pandas as pd
+from modules import sheet_sync
+from modules.fake_sheets import FakeSpreadsheet
+
+HEADER = ['reviewer_id', 'name', 'total_reviews', 'followers']
+ROWS = [[1, 'Ann', 2, 3], [2, 'Bob', 1, 0], [3, 'Cid', 4, 10]]
+
+def _sheet(rows):
+    return FakeSpreadsheet({'reviewers': [HEADER] + [list(r) for r in rows]}).worksheet('reviewers')
+
+def _local():
+    return pd.DataFrame(ROWS, columns=HEADER)
+
+def _state(df):
+    return sheet_sync.sheet_state({'reviewers': df})['reviewers']
+
+def test_unchanged_sheet_gives_empty_delta():
+    local = _local()
+    delta = sheet_sync.diff_sheet(_sheet(ROWS), 'reviewers', local, _state(local))
+    assert delta.is_empty()
+
+def test_appended_rows_only():
+    local = _local()
+    delta = sheet_sync.diff_sheet(_sheet(ROWS + [[4, 'Dee', 1, 2]]), 'reviewers', local, _state(local))
+    assert delta.replace is None
+    assert delta.append.values.tolist() == [[4, 'Dee', 1, 2]]
+    assert delta.update.empty
+
+def test_changed_mutable_columns_are_patched_by_key():
+    local = _local()
+    remote = [[1, 'Ann', 2, 4], [2, 'Bob', 1, 0], [3, 'Cid', 5, 10]]
+    delta = sheet_sync.diff_sheet(_sheet(remote), 'reviewers', local, _state(local))
+    assert delta.key == 'reviewer_id' and delta.append is None
+    assert delta.update.values.tolist() == [[1, 2, 4], [3, 5, 10]]
+
+def test_immutable_columns_are_not_compared():
+    # only the SYNC_PLAN mutable columns are re-read once a row exists
+    local = _local()
+    remote = [[1, 'Anne', 2, 3]] + ROWS[1:]
+    assert sheet_sync.diff_sheet(_sheet(remote), 'reviewers', local, _state(local)).is_empty()
+
+def test_deleted_or_reordered_rows_fall_back_to_full():
+    local = _local()
+    for remote in [ROWS[:2], [ROWS[1], ROWS[0], ROWS[2]]]:
+        delta = sheet_sync.diff_sheet(_sheet(remote), 'reviewers', local, _state(local))
+        assert delta.replace['reviewer_id'].tolist() == [r[0] for r in remote]
+
+def test_header_change_or_missing_state_falls_back_to_full():
+    local = _local()
+    assert sheet_sync.diff_sheet(_sheet(ROWS), 'reviewers', local, None).replace is not None
+    state = dict(_state(local), header=HEADER[:3])
+    assert sheet_sync.diff_sheet(_sheet(ROWS), 'reviewers', local, state).replace is not None
@@ -0,0 +1,108 @@
+# tests/test_similarity.py
+"""
+build_reviewer_vectors and the neighbour ranking on small hand-computed
+fixtures. Run as a script to time build_reviewer_vectors on the Kaggle CSV
+served through fake_sheets:
+
+    python -m tests.test_similarity
+"""
+import math
+import time
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from modules import db_manager, fake_sheets, similarity
+
+CSV_FILE = 'data/source_reviews.csv'
+
+# Ann reviewed restaurants 10, 11 and 12 (the last one rated "Like"), Bob
+# reviewed 10 twice, Cid nothing; the review without a reviewer_id is ignored
+REVIEWS = pd.DataFrame({
+    'id': [1, 2, 3, 4, 5, 6],
+    'restaurant_id': [10, 11, 12, 10, 10, 11],
+    'reviewer_name': ['Ann', 'Ann', 'Ann', 'Bob', 'Bob', 'Ghost'],
+    'rating': [5, 4, 'Like', 5, 3, 1],
+    'content': ['a', 'b', 'c', 'd', 'e', 'f'],
+    'timestamp': [''] * 6,
+    'pictures': [0] * 6,
+    'reviewer_id': [1, 1, 1, 2, 2, ''],
+})
+REVIEWERS = pd.DataFrame({'reviewer_id': [1, 2, 3], 'name': ['Ann', 'Bob', 'Cid'],
+                          'total_reviews': [3, 2, 0], 'followers': [0, 0, 0]})
+
+def _db(data):
+    con = duckdb.connect(database=':memory:')
+    data = db_manager._cast_types(data)
+    for name in db_manager.TABLE_SCHEMAS:
+        db_manager._materialize(con, name, data.get(name))
+    return con
+
+def _fake_db(csv_path=CSV_FILE):
+    """In-memory DuckDB holding the typed sheets, as db_manager.get_db() serves them."""
+    return _db(db_manager.fetch_sheets(fake_sheets.FakeSheetClient(csv_path).open(db_manager.SHEET_NAME)))
+
+@pytest.fixture
+def small_db(monkeypatch):
+    con = _db({'reviews': REVIEWS, 'reviewers': REVIEWERS})
+    monkeypatch.setattr(db_manager, 'get_db', lambda: con)
+    return con
+
+def test_reviewer_vectors_hand_computed(small_db):
+    df, vectors, rev_ids = similarity.build_reviewer_vectors()
+
+    assert rev_ids == [1, 2, 3]
+    assert list(df.index) == [1, 2, 3]
+    assert sp.issparse(vectors)
+    # 5 rating columns (5..1), then one column per restaurant 10, 11, 12
+    assert vectors.shape == (3, 8)
+
+    # smooth idf over 3 reviewers: ln((1 + 3) / (1 + df)) + 1
+    idf_10 = math.log(4 / 3) + 1   # Ann and Bob
+    idf_11 = math.log(4 / 2) + 1   # Ann only ("Ghost" has no reviewer_id)
+    ann = np.array([idf_10, idf_11, idf_11]) / math.sqrt(idf_10 ** 2 + 2 * idf_11 ** 2)
+    expected = np.array([
+        [1, 1, 0, 0, 0, *ann],          # Ann: 5 and 4 stars, "Like" is not a star rating
+        [1, 0, 1, 0, 0, 1, 0, 0],       # Bob: 2 x restaurant 10, normalized to 1
+        [0, 0, 0, 0, 0, 0, 0, 0],       # Cid: no reviews
+    ])
+    np.testing.assert_allclose(vectors.toarray(), expected, rtol=0, atol=1e-12)
+
+def test_top_k_neighbors_hand_computed():
+    # cos(0, 1) = cos(1, 2) = 1/sqrt(2), cos(0, 2) = 0
+    vectors = sp.csr_matrix(np.array([[1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]))
+    positions, scores = similarity.top_k_neighbors(vectors, k=2)
+    # the row itself is excluded; row 1's tie goes to the lower position
+    np.testing.assert_array_equal(positions, [[1, 2], [0, 2], [1, 0]])
+    np.testing.assert_allclose(scores, [[0.5 ** 0.5, 0], [0.5 ** 0.5, 0.5 ** 0.5], [0.5 ** 0.5, 0]], atol=1e-6)
+
+    index = similarity.NeighborIndex.from_vectors([7, 8, 9], vectors, k=2)
+    ids, _ = index.lookup(9, top_n=1)
+    assert ids.tolist() == [8]
+    assert index.lookup(5) is None
+    restored = similarity.NeighborIndex.from_frame(index.to_frame())
+    np.testing.assert_array_equal(restored.neighbor_ids, index.neighbor_ids)
+
+def test_scan_matches_index_and_goes_past_top_k():
+    rng = np.random.default_rng(0)
+    vectors = sp.random(60, 30, density=0.2, random_state=rng, format='csr')
+    ids = np.arange(101, 161)
+    index = similarity.NeighborIndex.from_vectors(ids, vectors, k=10)
+    for entity_id in ids[:5]:
+        want_ids, want_scores = index.lookup(entity_id)
+        got_ids, got_scores = similarity.scan_neighbors(ids, vectors, entity_id, 25)
+        assert len(got_ids) == 25 and entity_id not in got_ids
+        np.testing.assert_array_equal(got_ids[:10], want_ids)
+        np.testing.assert_allclose(got_scores[:10], want_scores, rtol=1e-6)
+        assert np.all(np.diff(got_scores) <= 0)
+    assert len(similarity.scan_neighbors(ids, vectors, ids[0], 500)[0]) == len(ids) - 1
+    assert similarity.scan_neighbors(ids, vectors, 999, 5) is None
+
+if __name__ == '__main__':
+    con = _fake_db()
+    db_manager.get_db = lambda: con
+    start = time.perf_counter()
+    df, vectors, _ = similarity.build_reviewer_vectors()
+    print(f"build_reviewer_vectors: {len(df):,} reviewers, {vectors.shape[1]:,} columns "
+          f"in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,52 @@
+# tests/test_write_queue.py
+import threading
+from modules.write_queue import WriteQueue
+
+def _queue(flush_fn, max_pending=100):
+    # long interval: only explicit flushes (or max_pending) write
+    return WriteQueue(flush_fn, interval=3600, max_pending=max_pending)
+
+def test_flush_coalesces_changes():
+    batches = []
+    q = _queue(lambda deltas, lists: batches.append((deltas, lists)))
+    q.add_follower_delta(1, +1)
+    q.add_follower_delta(1, +1)
+    q.add_follower_delta(2, +1)
+    q.add_follower_delta(2, -1)     # follow + unfollow cancel out
+    q.set_followed_list(7, [1, 2])
+    q.set_followed_list(7, [1])     # latest list wins
+    assert q.pending() == 2
+
+    assert q.flush() is True
+    assert batches == [({1: 2}, {7: [1]})]
+    assert q.pending() == 0
+    assert q.flush() is True and len(batches) == 1   # nothing queued, nothing written
+
+def test_failed_flush_requeues_and_merges_with_newer_changes():
+    fail = [True]
+    written = []
+    def flush_fn(deltas, lists):
+        if fail[0]:
+            raise ConnectionError("sheet down")
+        written.append((deltas, lists))
+
+    q = _queue(flush_fn)
+    q.add_follower_delta(1, +1)
+    q.set_followed_list(7, [1])
+    assert q.flush() is False
+    assert q.pending() == 2
+
+    q.add_follower_delta(1, +1)
+    q.set_followed_list(7, [1, 3])
+    fail[0] = False
+    assert q.flush() is True
+    # deltas add up, the list queued after the failure is kept
+    assert written == [({1: 2}, {7: [1, 3]})]
+
+def test_max_pending_wakes_the_writer():
+    flushed = threading.Event()
+    q = _queue(lambda deltas, lists: flushed.set(), max_pending=2)
+    q.add_follower_delta(1, +1)
+    assert not flushed.wait(0.2)
+    q.add_follower_delta(2, +1)
+    assert flushed.wait(5)